@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The test script imports its modules by name, as it runs from its own folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "testscript"))
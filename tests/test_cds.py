@@ -0,0 +1,105 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import cds
+import pytest
+import testcase
+from common import Direction
+from launcher import launch
+
+TESTCASES = Path(__file__).resolve().parent.parent / "testcases"
+
+# Copies its input to where the project's translator writes its output
+TRANSLATOR = """package src;
+
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+
+public class Translate {
+    public static void main(String[] args) throws Exception {
+        Path input = Paths.get(args[3]);
+        String stem = input.getFileName().toString().replaceFirst("[.][^.]*$", "");
+        String name = args[1].equals("t2b") ? stem + "_t2b.brf" : stem + "_b2t.txt";
+        Files.write(Paths.get("out", name), Files.readAllBytes(input));
+    }
+}
+"""
+
+
+@pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("java", "javac", "jar")),
+    reason="needs a JDK",
+)
+def test_build_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(cds, "CDS_DIR", tmp_path / "cds")
+    proj_dir = tmp_path / "1-RW214-project"
+    (proj_dir / "src").mkdir(parents=True)
+    (proj_dir / "out").mkdir()
+    (proj_dir / "src" / "Translate.java").write_text(TRANSLATOR)
+    subprocess.run(
+        [
+            "javac",
+            "-d",
+            str(proj_dir / "bin"),
+            str(proj_dir / "src" / "Translate.java"),
+        ],
+        check=True,
+    )
+    case = testcase.Testcase(TESTCASES / "easy4")
+
+    archive = cds.build_archive(
+        testcase.TestSet([case]), proj_dir, proj_dir / "bin", 60
+    )
+
+    assert archive is not None
+    assert archive.exists() and archive.stat().st_size > 0
+    # -Xshare:on makes the JVM fail rather than run without the archive
+    options = cds.archive_options(archive)
+    options.jvm_args.append("-Xshare:on")
+    invocation = launch(
+        options.command(
+            proj_dir / "bin",
+            Direction.T2B,
+            case.level,
+            case.root / "afr.txt",
+            case.root.name,
+        ),
+        cwd=proj_dir,
+        timeout=60,
+    )
+    assert invocation.ok, invocation.err
+    assert (proj_dir / "out" / "afr_t2b.brf").exists()
+
+
+def test_training_set_covers_each_level_in_both_directions():
+    cases = [
+        testcase.Testcase(folder)
+        for folder in sorted(TESTCASES.iterdir())
+        if folder.is_dir()
+    ]
+
+    pairs = cds.training_set(testcase.TestSet(cases))
+
+    levels = {case.level for case in cases}
+    assert len(pairs) == 2 * len(levels)
+    assert {(case.level, direction) for case, direction in pairs} == {
+        (level, direction)
+        for level in levels
+        for direction in (Direction.B2T, Direction.T2B)
+    }
+
+
+def test_archive_options_run_from_the_jar_beside_the_archive(tmp_path):
+    archive = tmp_path / "translate.jsa"
+
+    options = cds.archive_options(archive, capture="pipe")
+    command = options.command(
+        tmp_path / "bin", Direction.B2T, "1.0", tmp_path / "brf.brf", "case"
+    )
+
+    assert options.jvm_args[: len(cds.STARTUP_FLAGS)] == cds.STARTUP_FLAGS
+    assert f"-XX:SharedArchiveFile={archive.absolute()}" in options.jvm_args
+    assert command[command.index("-cp") + 1] == str(tmp_path / cds.JAR_NAME)
+    assert str(tmp_path / "bin") not in command
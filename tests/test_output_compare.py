@@ -0,0 +1,22 @@
+import io
+
+import pytest
+from output_compare import first_difference
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        (b"abc", b"abc", None),
+        (b"abc", b"abd", [2, 1, 3]),
+        (b"ab", b"abc", [2, 1, 3]),
+        (b"a\r\nb", b"a\nc", [2, 2, 1]),
+        ("xé".encode(), "xè".encode(), [2, 1, 2]),
+        ("é".encode(), b"\xc3", [1, 1, 1]),
+        (b"\xc3", "é".encode(), [1, 1, 1]),
+        ("aé\nb".encode(), "aé".encode(), [3, 1, 3]),
+    ],
+)
+def test_first_difference(a, b, expected):
+    difference = first_difference(io.BytesIO(a), io.BytesIO(b))
+    assert (difference and difference.to_list()) == expected
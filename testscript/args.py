@@ -1,6 +1,8 @@
 import argparse
 from pathlib import Path
-from typing import Final
+from typing import Final, Literal
+
+from common import STATE_DIR
 
 ##########################################################
 VERSION_NUMBER: Final["tuple[int, int, int, str]"] = (1, 0, 0, "")
@@ -10,6 +12,8 @@ VERSION_STR: Final[str] = ".".join(str(x) for x in VERSION_NUMBER[:3]) + (
 )
 ##########################################################
 
+DEFAULT_PORT: Final[int] = 8214
+
 LONG_DESC = """
 Test script for the RW214 Braille-Afrikaans Translator project.
 
@@ -79,6 +83,125 @@ def get_args(args: "list[str]") -> "tuple[argparse.Namespace, argparse.ArgumentP
         default=False,
     )
 
+    schedule_group = test_parser.add_argument_group(
+        "Scheduling options", "Options for ordering and parallelising testcases"
+    )
+    schedule_group.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of testcases to run in parallel",
+        default=1,
+    )
+    schedule_group.add_argument(
+        "--failed-first",
+        help="Run testcases that failed in the previous run first",
+        action="store_true",
+        default=False,
+    )
+    schedule_group.add_argument(
+        "--max-failures",
+        type=int,
+        metavar="N",
+        help="Stop the run once N testcases have failed or errored",
+        default=None,
+    )
+    schedule_group.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Stop the run after SECONDS, running the most informative testcases first",
+        default=None,
+    )
+    schedule_group.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue an interrupted or stopped run, skipping the translator runs it finished (the sources must not have changed)",
+        default=None,
+    )
+    schedule_group.add_argument(
+        "--no-dedup",
+        help="Run the translator for every testcase, even if another testcase has the same input and level",
+        action="store_false",
+        dest="dedup",
+        default=True,
+    )
+
+    jvm_group = test_parser.add_argument_group(
+        "JVM options", "Options for how the translator JVM is launched"
+    )
+    jvm_group.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=STATE_DIR / "profiles",
+        default=None,
+        metavar="DIR",
+        help="Record each translator run with Java Flight Recorder into DIR and summarise the recordings",
+    )
+    jvm_group.add_argument(
+        "--capture",
+        choices=["file", "pipe"],
+        help="How to collect the translator's output: from the file it writes in out/, or through a named pipe in its place (Linux only, falls back to the file if the translator replaces the pipe)",
+        default="file",
+    )
+    jvm_group.add_argument(
+        "--cds",
+        help="Build a class data sharing archive from a training run and launch the translator with it and startup-tuned JVM flags",
+        action="store_true",
+        default=False,
+    )
+
+    timing_group = test_parser.add_argument_group(
+        "Timing options", "Options for how translator runs are timed"
+    )
+    timing_group.add_argument(
+        "--stable-timing",
+        help="After the run, time each translator run again on a dedicated core (Linux only), discarding outliers, and record those timings; warns when the host is too noisy",
+        action="store_true",
+        default=False,
+    )
+    timing_group.add_argument(
+        "--stable-rounds",
+        type=int,
+        metavar="N",
+        help="Number of times to time each translator run with --stable-timing",
+        default=7,
+    )
+
+    limit_group = test_parser.add_argument_group(
+        "Resource limits",
+        "Limits on each translator run (not on Windows). A run that exceeds one is reported as LIMIT_EXCEEDED.",
+    )
+    limit_group.add_argument(
+        "--limit-memory",
+        type=int,
+        metavar="MB",
+        help="Maximum virtual memory (the JVM reserves far more than it uses, so be generous)",
+        default=None,
+    )
+    limit_group.add_argument(
+        "--limit-cpu",
+        type=int,
+        metavar="SECONDS",
+        help="Maximum CPU time",
+        default=None,
+    )
+    limit_group.add_argument(
+        "--limit-files",
+        type=int,
+        metavar="N",
+        help="Maximum number of open files",
+        default=None,
+    )
+    limit_group.add_argument(
+        "--limit-output",
+        type=int,
+        metavar="MB",
+        help="Maximum size of any file written",
+        default=None,
+    )
+
     output_group = test_parser.add_argument_group(
         "Output options", "Options for enabling output and setting output format"
     )
@@ -96,6 +219,27 @@ def get_args(args: "list[str]") -> "tuple[argparse.Namespace, argparse.ArgumentP
         default=False,
     )
 
+    output_group.add_argument(
+        "--spill",
+        help="Keep finished results in a log in .testscript/ instead of in memory, for very large corpora",
+        action="store_true",
+        default=False,
+    )
+    output_group.add_argument(
+        "--trace",
+        type=Path,
+        metavar="FILE",
+        help="Write a timeline of the run to FILE as Chrome trace events, for chrome://tracing or ui.perfetto.dev",
+        default=None,
+    )
+    output_group.add_argument(
+        "--no-history",
+        help="Do not save the results of this run to the run history",
+        action="store_false",
+        dest="history",
+        default=True,
+    )
+
     subparsers.add_parser(
         "validate", help="Validate testcases structure, but do not run tests"
     )
@@ -115,6 +259,325 @@ def get_args(args: "list[str]") -> "tuple[argparse.Namespace, argparse.ArgumentP
         help='Tags of the testcase in the format "tag1:tag2:tag3"',
     )
 
+    import_parser = subparsers.add_parser(
+        "import", help="Create many testcases at once from a JSONL or CSV file"
+    )
+    import_parser.add_argument(
+        "file",
+        type=Path,
+        help="file of records with the fields name, desc, level, tags, afrikaans and braille",
+    )
+    import_parser.add_argument(
+        "-f",
+        "--format",
+        choices=["jsonl", "csv"],
+        help="Format of the file (default: from the file extension)",
+        default=None,
+    )
+    import_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of records to validate and write in parallel",
+        default=8,
+    )
+    import_parser.add_argument(
+        "--dry-run",
+        help="Only validate the records, do not create any testcases",
+        action="store_true",
+        default=False,
+    )
+
+    loadtest_parser = subparsers.add_parser(
+        "loadtest",
+        help="Measure translator throughput and latency at increasing concurrency",
+    )
+    loadtest_parser.add_argument(
+        "proj_dir",
+        type=str,
+        help="your project directory (your/path/to/<student_number>-RW214-project)",
+    )
+    loadtest_parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        help="Timeout for each translation in seconds",
+        default=10,
+    )
+    loadtest_parser.add_argument(
+        "-m",
+        "--max-concurrency",
+        type=int,
+        help="Highest concurrency level to test (default: twice the number of cores)",
+        default=None,
+    )
+    loadtest_parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        help="Number of passes over the testcases at each concurrency level",
+        default=1,
+    )
+    loadtest_parser.add_argument(
+        "--min-gain",
+        type=float,
+        help="Throughput gain (in percent) below which more concurrency is considered not to help",
+        default=10,
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare the speed and output of two builds of the project"
+    )
+    compare_parser.add_argument(
+        "proj_a",
+        type=str,
+        help="the baseline project directory (A)",
+    )
+    compare_parser.add_argument(
+        "proj_b",
+        type=str,
+        help="the project directory compared against it (B)",
+    )
+    compare_parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        help="Timeout for each translation in seconds",
+        default=10,
+    )
+    compare_parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        help="Number of times each translation is timed on each build",
+        default=10,
+    )
+    compare_parser.add_argument(
+        "--confidence",
+        type=float,
+        help="Confidence level (in percent) of the speedup intervals and significance tests",
+        default=95,
+    )
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Benchmark the test script itself on a synthetic corpus"
+    )
+    bench_parser.add_argument(
+        "-n",
+        "--cases",
+        type=int,
+        help="Number of testcases in the synthetic corpus",
+        default=10000,
+    )
+    bench_parser.add_argument(
+        "-s",
+        "--output-size",
+        type=float,
+        help="Size of synthetic translator outputs in megabytes",
+        default=2,
+    )
+    bench_parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        help="Number of times each benchmark is repeated",
+        default=5,
+    )
+    bench_parser.add_argument(
+        "-f",
+        "--filter",
+        type=str,
+        help="Only run benchmarks whose name contains this text",
+        default=None,
+    )
+    bench_parser.add_argument(
+        "--threshold",
+        type=float,
+        help="Slowdown (in percent) against the previous saved results reported as a regression",
+        default=10,
+    )
+    bench_parser.add_argument(
+        "--no-save",
+        help="Do not save the results for comparison with later runs",
+        action="store_false",
+        dest="save",
+        default=True,
+    )
+
+    coordinator_parser = subparsers.add_parser(
+        "coordinator",
+        help="Serve the testcases to workers, which may run on other machines, and report their results",
+    )
+    coordinator_parser.add_argument(
+        "--host",
+        type=str,
+        help="Address to listen on (use 0.0.0.0 to accept workers from other machines)",
+        default="127.0.0.1",
+    )
+    coordinator_parser.add_argument(
+        "--port",
+        type=int,
+        help="Port to listen on",
+        default=DEFAULT_PORT,
+    )
+    coordinator_parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        help="Timeout for each testcase in seconds, used by every worker",
+        default=10,
+    )
+    coordinator_parser.add_argument(
+        "-e",
+        "--error",
+        help="Show error messages output by the program",
+        action="store_true",
+        default=False,
+    )
+    coordinator_parser.add_argument(
+        "--failed-first",
+        help="Hand out testcases that failed in the previous run first",
+        action="store_true",
+        default=False,
+    )
+    coordinator_parser.add_argument(
+        "--no-dedup",
+        help="Run the translator for every testcase, even if another testcase has the same input and level",
+        action="store_false",
+        dest="dedup",
+        default=True,
+    )
+    coordinator_parser.add_argument(
+        "-d",
+        "--details",
+        help="Show details of testcases (name, level, tags) in detail views (may produce a lot of output)",
+        action="store_true",
+        default=False,
+    )
+    coordinator_parser.add_argument(
+        "--show-passing",
+        help="Show passing testcases in detail views (may produce a lot of output)",
+        action="store_true",
+        default=False,
+    )
+
+    worker_parser = subparsers.add_parser(
+        "worker",
+        help="Build the project and run testcases handed out by a coordinator",
+    )
+    worker_parser.add_argument(
+        "proj_dir",
+        type=str,
+        help="your project directory (your/path/to/<student_number>-RW214-project)",
+    )
+    worker_parser.add_argument(
+        "--host",
+        type=str,
+        help="Address of the coordinator",
+        default="127.0.0.1",
+    )
+    worker_parser.add_argument(
+        "--port",
+        type=int,
+        help="Port of the coordinator",
+        default=DEFAULT_PORT,
+    )
+    worker_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of testcases to run in parallel on this machine",
+        default=1,
+    )
+
+    bisect_parser = subparsers.add_parser(
+        "bisect-perf",
+        help="Find the commit of a git project that made its translations slower or fail",
+    )
+    bisect_parser.add_argument(
+        "proj_dir",
+        type=str,
+        help="the project directory, inside a git repository",
+    )
+    bisect_parser.add_argument(
+        "good",
+        type=str,
+        help="a commit without the regression",
+    )
+    bisect_parser.add_argument(
+        "bad",
+        type=str,
+        nargs="?",
+        help="a commit with the regression",
+        default="HEAD",
+    )
+    bisect_parser.add_argument(
+        "-c",
+        "--case",
+        type=str,
+        action="append",
+        dest="cases",
+        help="Only time testcases whose folder or name contains this (repeatable)",
+        default=[],
+    )
+    bisect_parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        help="Timeout for each translation in seconds",
+        default=10,
+    )
+    bisect_parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        help="Number of times each translation is timed on each commit",
+        default=5,
+    )
+    bisect_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of commits built and timed at once",
+        default=3,
+    )
+    bisect_parser.add_argument(
+        "--threshold",
+        type=float,
+        help="Slowdown (in percent) of a translation's median time counted as a regression",
+        default=25,
+    )
+
+    history_parser = subparsers.add_parser(
+        "history", help="Show runtime trends and regressions from previous runs"
+    )
+    history_parser.add_argument(
+        "-r",
+        "--runs",
+        type=int,
+        help="Number of most recent runs to consider",
+        default=20,
+    )
+    history_parser.add_argument(
+        "--case",
+        type=str,
+        help="Only show the testcase with this folder name",
+        default=None,
+    )
+    history_parser.add_argument(
+        "-s",
+        "--slowest",
+        type=int,
+        help="Number of slowest testcases to show",
+        default=10,
+    )
+    history_parser.add_argument(
+        "--threshold",
+        type=float,
+        help="Slowdown (in percent) over the previous runs reported as a regression",
+        default=25,
+    )
+
     return parser.parse_args(args), parser
 
 
@@ -143,6 +606,31 @@ class TestArgs(ArgsWrapper):
         self.details: bool = args.details
         self.show_passing: bool = args.show_passing
         self.error_output: bool = args.error
+        self.jobs: int = max(args.jobs, 1)
+        self.failed_first: bool = args.failed_first
+        self.dedup: bool = args.dedup
+        self.max_failures: "int | None" = args.max_failures
+        self.time_budget: "float | None" = args.time_budget
+        self.resume: "str | None" = args.resume
+        self.history: bool = args.history
+        self.spill: bool = args.spill
+        self.trace: "Path | None" = args.trace
+        self.profile: "Path | None" = args.profile
+        self.cds: bool = args.cds
+        self.capture: 'Literal["file", "pipe"]' = args.capture
+        self.stable_timing: bool = args.stable_timing
+        self.stable_rounds: int = max(args.stable_rounds, 2)
+        # Resource limits by launcher.LIMITS name, in bytes, seconds or a count
+        self.limits: "dict[str, int]" = {
+            name: value * scale
+            for name, value, scale in (
+                ("memory", args.limit_memory, 1024 * 1024),
+                ("cpu", args.limit_cpu, 1),
+                ("files", args.limit_files, 1),
+                ("output", args.limit_output, 1024 * 1024),
+            )
+            if value is not None
+        }
 
 
 class ValidateArgs(ArgsWrapper): ...
@@ -155,3 +643,87 @@ class CreateArgs(ArgsWrapper):
         self.info: str = args.info
         self.level: str = args.level
         self.tags: list[str] = args.tags
+
+
+class ImportArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.file: Path = args.file
+        self.format: "str | None" = args.format
+        self.jobs: int = max(args.jobs, 1)
+        self.dry_run: bool = args.dry_run
+
+
+class LoadTestArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.proj: Path = Path(args.proj_dir).resolve(strict=True)
+        self.timeout: int = args.timeout
+        self.max_concurrency: "int | None" = args.max_concurrency
+        self.rounds: int = max(args.rounds, 1)
+        self.min_gain: float = args.min_gain / 100
+
+
+class CompareArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.proj_a: Path = Path(args.proj_a).resolve(strict=True)
+        self.proj_b: Path = Path(args.proj_b).resolve(strict=True)
+        self.timeout: int = args.timeout
+        self.rounds: int = max(args.rounds, 1)
+        self.confidence: float = min(max(args.confidence, 50), 99.9) / 100
+
+
+class BisectPerfArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.proj: Path = Path(args.proj_dir).resolve(strict=True)
+        self.good: str = args.good
+        self.bad: str = args.bad
+        self.cases: "list[str]" = args.cases
+        self.timeout: int = args.timeout
+        self.rounds: int = max(args.rounds, 1)
+        self.jobs: int = max(args.jobs, 1)
+        self.threshold: float = args.threshold / 100
+
+
+class BenchArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.cases: int = max(args.cases, 1)
+        self.output_size: float = args.output_size
+        self.repeat: int = max(args.repeat, 1)
+        self.filter: "str | None" = args.filter
+        self.threshold: float = args.threshold / 100
+        self.save: bool = args.save
+
+
+class HistoryArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.runs: int = max(args.runs, 1)
+        self.case: "str | None" = args.case
+        self.slowest: int = args.slowest
+        self.threshold: float = args.threshold / 100
+
+
+class CoordinatorArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.host: str = args.host
+        self.port: int = args.port
+        self.timeout: int = args.timeout
+        self.error_output: bool = args.error
+        self.failed_first: bool = args.failed_first
+        self.dedup: bool = args.dedup
+        self.details: bool = args.details
+        self.show_passing: bool = args.show_passing
+
+
+class WorkerArgs(ArgsWrapper):
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.proj: Path = Path(args.proj_dir).resolve(strict=True)
+        self.host: str = args.host
+        self.port: int = args.port
+        self.jobs: int = max(args.jobs, 1)
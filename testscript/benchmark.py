@@ -0,0 +1,211 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import common
+from args import BenchArgs, ValidateArgs
+from common import STATE_DIR, ColoredString, Direction, Status
+from report_formatter import TableFormatter
+from table_maker import TableMaker, custom_tabulate
+from testcase import Testcase, TestSet
+from validate_cases import validate
+
+BENCH_FILE = STATE_DIR / "bench.json"
+
+WORDS = ["dit", "is", "warm", "vandag", "môre", "ek", "hê", "nie", "geen", "oë"]
+
+
+def synthetic_text(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    ret = []
+    length = 0
+    while length < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(12)) + ".\n"
+        ret.append(line)
+        length += len(line)
+    return "".join(ret)[:size]
+
+
+def mutate(text: str, changes: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    chars = list(text)
+    for _ in range(changes):
+        chars[rng.randrange(len(chars))] = "x"
+    return "".join(chars)
+
+
+def write_corpus(root: Path, count: int) -> Path:
+    testcases = root / "testcases"
+    for n in range(count):
+        folder = testcases / f"case-{n}"
+        folder.mkdir(parents=True)
+        (folder / "manifest.json").write_text(
+            json.dumps({"name": f"Case {n}", "desc": "Synthetic", "level": "1.0"})
+        )
+        (folder / "afr.txt").write_text(synthetic_text(200, n), encoding="utf-8")
+        (folder / "brf.brf").write_text(synthetic_text(200, n), encoding="utf-8")
+    return testcases
+
+
+def finished_testset(testcases: Path, count: int, output_size: int) -> TestSet:
+    # Failed testcases with large outputs, as the report would see them
+    testset = TestSet()
+    expected = synthetic_text(output_size)
+    recieved = mutate(expected, 20)
+    for n, folder in enumerate(sorted(testcases.iterdir())[:count]):
+        testcase = Testcase(folder, strict=False)
+        testcase.result = Testcase.TestResult(
+            input_afr=expected,
+            recieved_brf=recieved,
+            expected_afr=expected,
+            input_brf=expected,
+            recieved_afr=recieved,
+            expected_brf=expected,
+        )
+        testcase.status = Status.FAILED
+        testcase.statuses = {Direction.B2T: Status.FAILED, Direction.T2B: Status.FAILED}
+        testset.add(testcase)
+    testset.complete = True
+    return testset
+
+
+def benchmarks(args: BenchArgs, root: Path) -> "dict[str, Callable[[], object]]":
+    size = int(args.output_size * 1024 * 1024)
+    diff_size = max(size // 64, 1024)  # ex_v_fd is super-linear, keep it tractable
+    text = synthetic_text(size)
+    diff_ex, diff_fd = synthetic_text(diff_size), mutate(synthetic_text(diff_size), 10)
+    spans: "list[common.Span]" = [
+        (text[i : i + 16], "green" if i % 32 else "red")
+        for i in range(0, len(text), 16)
+    ]
+    rows = [
+        [
+            f"case-{n}",
+            "1.0",
+            ColoredString(common.colorize("FAILED", "red")),
+            f"{n / 7:.2f}s",
+        ]
+        for n in range(args.cases)
+    ]
+    print(f"Writing synthetic corpus of {args.cases} testcases...")
+    testcases = write_corpus(root, args.cases)
+    report_set = finished_testset(testcases, min(args.cases, 100), size // 100)
+
+    def load():
+        return [Testcase(folder) for folder in testcases.iterdir()]
+
+    def validate_all():
+        cwd = Path.cwd()
+        os.chdir(root)
+        try:
+            validate(
+                ValidateArgs(
+                    argparse.Namespace(
+                        action="validate", color=True, pretty_print=True, debug=False
+                    )
+                )
+            )
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "ex_v_fd": lambda: common.ex_v_fd(diff_ex, diff_fd),
+        # Built afresh each time, as len() is cached once computed
+        "ColoredString.from_spans + len": lambda: len(ColoredString.from_spans(spans)),
+        "custom_tabulate": lambda: custom_tabulate(rows),
+        "TableMaker": lambda: TableMaker(rows),
+        "TableFormatter.format": lambda: TableFormatter().format(
+            report_set, show_passing=True, details=True
+        ),
+        "Testcase loading": load,
+        "validate": validate_all,
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> "list[float]":
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+    return times
+
+
+def load_previous(args: BenchArgs) -> "dict[str, float]":
+    # Latest saved result of each benchmark run with the same corpus size
+    if not BENCH_FILE.exists():
+        return {}
+    with open(BENCH_FILE, "r") as f:
+        runs = json.load(f)
+    previous: "dict[str, float]" = {}
+    for run in reversed(runs):
+        if run["cases"] == args.cases and run["output_size"] == args.output_size:
+            for name, value in run["results"].items():
+                previous.setdefault(name, value)
+    return previous
+
+
+def save(results: "dict[str, float]", args: BenchArgs) -> None:
+    runs = []
+    if BENCH_FILE.exists():
+        with open(BENCH_FILE, "r") as f:
+            runs = json.load(f)
+    runs.append(
+        {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "cases": args.cases,
+            "output_size": args.output_size,
+            "results": results,
+        }
+    )
+    BENCH_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(BENCH_FILE, "w") as f:
+        json.dump(runs, f, indent=2)
+
+
+def bench(args: BenchArgs):
+    previous = load_previous(args)
+    results: "dict[str, float]" = {}
+    table = [["Benchmark", "Median", "Min", "Previous", "Change"]]
+    regressions = []
+    with tempfile.TemporaryDirectory(prefix="rw214-bench-") as tmp:
+        for name, func in benchmarks(args, Path(tmp)).items():
+            if args.filter and args.filter.lower() not in name.lower():
+                continue
+            print(f"Running {name}...")
+            times = measure(func, args.repeat)
+            median = statistics.median(times)
+            results[name] = median
+            change = ""
+            if name in previous and previous[name] > 0:
+                ratio = median / previous[name] - 1
+                change = f"{ratio * 100:+.1f}%"
+                if ratio > args.threshold:
+                    regressions.append(name)
+                    change += " REGRESSED"
+            table.append(
+                [
+                    name,
+                    f"{median * 1000:.2f} ms",
+                    f"{min(times) * 1000:.2f} ms",
+                    f"{previous[name] * 1000:.2f} ms" if name in previous else "-",
+                    change or "-",
+                ]
+            )
+    print(TableMaker(table))
+    if args.save:
+        save(results, args)
+        print(f"Results saved to {BENCH_FILE}")
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) regressed by more than {args.threshold * 100:.0f}%"
+        )
+        sys.exit(1)
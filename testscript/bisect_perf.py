@@ -0,0 +1,310 @@
+import concurrent.futures
+import math
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from args import BisectPerfArgs
+from build import finish_build, start_build
+from common import Direction
+from launcher import Invocation
+from output_compare import Output, compare_output
+from table_maker import TableMaker
+from test_prog import load_testcases, resolve_project
+from testcase import Testcase
+
+
+def git(repo: Path, *args: str) -> str:
+    # Raises subprocess.CalledProcessError with git's message in stderr
+    return subprocess.run(
+        ["git", *args], cwd=repo, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+class Candidate:
+    # A commit checked out in a worktree of its own, and its timings in the
+    # current step. Times and passes are keyed by (case, direction).
+    def __init__(self, index: int, commit: str, subject: str, path: Path) -> None:
+        self.index = index  # position in the range, -1 for the good commit
+        self.commit = commit
+        self.subject = subject
+        self.path = path
+        self.proj_dir = path
+        self.times: "dict[tuple[str, Direction], list[float]]" = {}
+        self.passed: "dict[tuple[str, Direction], bool]" = {}
+
+    def __str__(self) -> str:
+        return f"{self.commit[:10]} {self.subject}"
+
+
+def checkout(repo: Path, prefix: Path, candidate: Candidate) -> None:
+    git(
+        repo,
+        "worktree",
+        "add",
+        "--detach",
+        "--quiet",
+        str(candidate.path),
+        candidate.commit,
+    )
+    candidate.proj_dir = candidate.path / prefix
+    for folder in ("bin", "out"):
+        (candidate.proj_dir / folder).mkdir(exist_ok=True)
+
+
+def remove(repo: Path, candidate: Candidate) -> None:
+    subprocess.run(
+        ["git", "worktree", "remove", "--force", str(candidate.path)],
+        cwd=repo,
+        capture_output=True,
+    )
+
+
+def passed(
+    testcase: Testcase,
+    direction: Direction,
+    invocation: Invocation,
+    output: "Output | None",
+    error: "str | None",
+) -> bool:
+    if not invocation.ok or error is not None or output is None:
+        return False
+    expected = testcase.root / Testcase.CONTEXTS[direction]["expected"]
+    return compare_output(expected, output) is None
+
+
+def measure(
+    candidates: "list[Candidate]",
+    pairs: "list[tuple[Testcase, Direction]]",
+    rounds: int,
+    timeout: int,
+    debug: bool,
+) -> None:
+    # Every candidate runs the same translation at the same moment, so each
+    # sees the same load from the others. Outputs are checked on the first
+    # round only.
+    for candidate in candidates:
+        candidate.times = {}
+        candidate.passed = {}
+
+    def run(candidate: Candidate, testcase: Testcase, direction: Direction, n: int):
+        key = (testcase.root.name, direction)
+        invocation, output, error = testcase.execute(
+            direction,
+            candidate.proj_dir,
+            candidate.proj_dir / "bin",
+            timeout,
+            debug=debug,
+        )
+        if invocation.ok and error is None:
+            candidate.times.setdefault(key, []).append(invocation.wall)
+        if n == 0:
+            candidate.passed[key] = passed(
+                testcase, direction, invocation, output, error
+            )
+        if output is not None:
+            output.discard()
+
+    with concurrent.futures.ThreadPoolExecutor(len(candidates)) as pool:
+        for n in range(rounds):
+            for testcase, direction in pairs:
+                for future in [
+                    pool.submit(run, candidate, testcase, direction, n)
+                    for candidate in candidates
+                ]:
+                    future.result()
+
+
+def regressions(
+    baseline: Candidate,
+    candidate: Candidate,
+    pairs: "list[tuple[Testcase, Direction]]",
+    threshold: float,
+) -> "list[list[str]]":
+    # Rows for every translation that fails where the good commit passes, or
+    # whose median time is more than threshold slower
+    rows = []
+    for testcase, direction in pairs:
+        key = (testcase.root.name, direction)
+        before, after = baseline.times.get(key), candidate.times.get(key)
+        before_ms = f"{statistics.median(before) * 1000:.0f} ms" if before else "-"
+        after_ms = f"{statistics.median(after) * 1000:.0f} ms" if after else "-"
+        if baseline.passed.get(key) and not candidate.passed.get(key):
+            rows.append([key[0], direction.name, before_ms, after_ms, "-", "now fails"])
+        elif before and after:
+            slowdown = statistics.median(after) / statistics.median(before)
+            if slowdown > 1 + threshold:
+                rows.append(
+                    [
+                        key[0],
+                        direction.name,
+                        before_ms,
+                        after_ms,
+                        f"{slowdown:.2f}x",
+                        "slower",
+                    ]
+                )
+    return rows
+
+
+def spread(indices: "list[int]", count: int) -> "list[int]":
+    # count indices evenly spaced through indices, or all of them if fewer
+    if len(indices) <= count:
+        return indices
+    return sorted(
+        {indices[(i + 1) * len(indices) // (count + 1)] for i in range(count)}
+    )
+
+
+def bisect_perf(args: BisectPerfArgs):
+    proj_dir = resolve_project(args.proj, args.debug)
+    if proj_dir is None:
+        return
+    try:
+        top = Path(git(proj_dir, "rev-parse", "--show-toplevel")).resolve()
+        good = git(proj_dir, "rev-parse", "--verify", f"{args.good}^{{commit}}")
+        bad = git(proj_dir, "rev-parse", "--verify", f"{args.bad}^{{commit}}")
+        log = git(
+            proj_dir,
+            "log",
+            "--reverse",
+            "--first-parent",
+            "--format=%H %s",
+            f"{good}..{bad}",
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"git failed: {e.stderr.strip()}")
+        sys.exit(1)
+    commits = [line.split(" ", 1) + [""] for line in log.splitlines()]
+    if not commits:
+        print(f"{args.bad} has no commits after {args.good}")
+        sys.exit(1)
+    prefix = proj_dir.relative_to(top)
+
+    testcases = [
+        testcase
+        for testcase in load_testcases(args.debug)
+        if not args.cases
+        or any(
+            pattern.lower() in testcase.root.name.lower()
+            or pattern.lower() in (testcase.name or "").lower()
+            for pattern in args.cases
+        )
+    ]
+    if not testcases:
+        print("No testcases match the given --case patterns")
+        sys.exit(1)
+    pairs = [
+        (testcase, direction)
+        for testcase in testcases
+        for direction in (Direction.B2T, Direction.T2B)
+    ]
+
+    steps = math.ceil(math.log(len(commits) + 1, args.jobs + 1))
+    print(
+        f"Bisecting {len(commits)} commits, {args.jobs} at a time"
+        f" (about {steps} steps), on {len(pairs)} translations"
+    )
+
+    root = Path(tempfile.mkdtemp(prefix="bisect-perf-"))
+    baseline = Candidate(-1, good, "(good)", root / "good")
+    # The bad end is only assumed to regress until the first step confirms it
+    low, high = -1, len(commits) - 1
+    confirmed = False
+    unbuildable: "set[int]" = set()
+    found: "list[list[str]]" = []
+    try:
+        checkout(proj_dir, prefix, baseline)
+        to_build = [baseline]
+        while True:
+            untested = [i for i in range(low + 1, high) if i not in unbuildable]
+            if confirmed:
+                indices = spread(untested, args.jobs)
+            else:
+                indices = spread(untested, args.jobs - 1) + [high]
+            if not indices:
+                break
+            batch = [
+                Candidate(i, commits[i][0], commits[i][1], root / commits[i][0])
+                for i in indices
+            ]
+            for candidate in batch:
+                checkout(proj_dir, prefix, candidate)
+            to_build += batch
+
+            # Build every commit of the step at once
+            builds = [
+                (candidate, start_build(candidate.proj_dir, args.debug))
+                for candidate in to_build
+            ]
+            built = []
+            for candidate, build in builds:
+                if finish_build(build, args.debug):
+                    built.append(candidate)
+                elif candidate is baseline:
+                    print(f"The good commit {baseline} does not build")
+                    sys.exit(1)
+                else:
+                    unbuildable.add(candidate.index)
+            to_build = []
+            if baseline not in built:
+                built.insert(0, baseline)
+
+            print(f"Timing {len(built) - 1} commits against {args.good}...")
+            measure(built, pairs, args.rounds, args.timeout, args.debug)
+
+            rows = [["Commit", "Subject", "Verdict"]]
+            first = None
+            for candidate in batch:
+                if candidate.index in unbuildable:
+                    verdict = "does not build"
+                else:
+                    found_rows = regressions(baseline, candidate, pairs, args.threshold)
+                    if found_rows and first is None:
+                        first, found = candidate, found_rows
+                    verdict = (
+                        f"regressed ({len(found_rows)} translations)"
+                        if found_rows
+                        else "good"
+                    )
+                rows.append([candidate.commit[:10], candidate.subject, verdict])
+            print(TableMaker(rows))
+
+            for candidate in batch:
+                remove(proj_dir, candidate)
+            tested = [c.index for c in batch if c.index not in unbuildable]
+            if not confirmed and high in unbuildable:
+                print(f"{args.bad} does not build, so cannot be compared")
+                sys.exit(1)
+            if first is None:
+                if not confirmed:
+                    print(
+                        f"No regression between {args.good} and {args.bad}"
+                        f" past {args.threshold:.0%}"
+                    )
+                    return
+                low = max(tested, default=low)
+            else:
+                confirmed = True
+                high = first.index
+                low = max([i for i in tested if i < high], default=low)
+    finally:
+        remove(proj_dir, baseline)
+        shutil.rmtree(root, ignore_errors=True)
+        subprocess.run(["git", "worktree", "prune"], cwd=proj_dir, capture_output=True)
+
+    commit, subject = commits[high][:2]
+    print(f"First regressing commit: {commit} {subject}")
+    skipped = [i for i in range(low + 1, high) if i in unbuildable]
+    if skipped:
+        print("It may also be one of these earlier commits, which do not build:")
+        for i in skipped:
+            print(f"  {commits[i][0]} {commits[i][1]}")
+    print(
+        TableMaker(
+            [["Testcase", "Direction", "Before", "After", "Slowdown", ""]] + found
+        )
+    )
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from pathlib import Path
+
+# Time allowed for javac before the build is considered to have failed
+BUILD_TIMEOUT = 60
+
+
+def start_build(proj_dir: Path, debug: bool = False) -> subprocess.Popen:
+    src_dir = proj_dir / "src"
+    bin_dir = proj_dir / "bin"
+    print("Building project...")
+    return subprocess.Popen(
+        args=["javac", *src_dir.glob("*.java"), "-d", bin_dir, "-Xlint"]
+        + (["-verbose"] if debug else []),
+        cwd=proj_dir,
+        stderr=sys.stdout if debug else subprocess.PIPE,
+    )
+
+
+def finish_build(p: subprocess.Popen, debug: bool = False) -> bool:
+    # Blocks until javac exits, returning as soon as it does
+    try:
+        out_bytes, err_bytes = p.communicate(timeout=BUILD_TIMEOUT)
+        if debug:
+            print("Build successful")
+    except subprocess.TimeoutExpired:
+        p.kill()
+        out_bytes, err_bytes = p.communicate()
+        print("Build failed due to timeout, please check your code and try again.")
+    out = out_bytes.decode("utf-8") if out_bytes is not None else "no output"
+    err = err_bytes.decode("utf-8") if err_bytes is not None else "no error output"
+    if debug:
+        print("stdout:\n", out)
+        print("stderr:\n", err)
+    else:
+        for line in out.splitlines():
+            if (
+                "errors" in line
+                or "warnings" in line
+                or "error" in line
+                or "warning" in line
+            ) and debug:
+                print(f"  {line}")
+            if line.startswith("[wrote"):
+                print("Compiled ", line.split()[1])
+        else:
+            print("No warnings")
+
+    if p.returncode != 0:
+        print(
+            f"Build failed with return code {0 if p.returncode == None else p.returncode}, please check your code and try again."
+        )
+        return False
+    return True
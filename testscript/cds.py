@@ -0,0 +1,205 @@
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Literal
+
+from common import STATE_DIR, Direction
+from launcher import LaunchOptions, launch
+from table_maker import TableMaker
+from testcase import Testcase, TestSet, make_lane
+
+# Each run builds its archive in a directory of its own under this one, so
+# concurrent runs never overwrite each other's
+CDS_DIR = STATE_DIR / "cds"
+
+# The JVM only archives classes loaded from jars, so the compiled classes are
+# packaged into one, kept next to the archive and used as the classpath of
+# every archived run
+JAR_NAME = "translator.jar"
+
+# Flags that favour a short-lived JVM: C1 only, the cheapest collector, no
+# perf data file and a small initial heap
+STARTUP_FLAGS = [
+    "-XX:TieredStopAtLevel=1",
+    "-XX:+UseSerialGC",
+    "-XX:-UsePerfData",
+    "-Xms16m",
+]
+
+
+def training_set(testset: TestSet) -> "list[tuple[Testcase, Direction]]":
+    # One case per level and direction is enough to load every class the
+    # translator needs
+    seen: "dict[str, Testcase]" = {}
+    for testcase in testset:
+        seen.setdefault(testcase.level, testcase)
+    return [
+        (testcase, direction)
+        for testcase in seen.values()
+        for direction in (Direction.B2T, Direction.T2B)
+    ]
+
+
+def archive_options(
+    archive: Path,
+    profile_dir: "Path | None" = None,
+    capture: 'Literal["file", "pipe"]' = "file",
+    limits: "dict[str, int] | None" = None,
+) -> LaunchOptions:
+    return LaunchOptions(
+        jvm_args=STARTUP_FLAGS + [f"-XX:SharedArchiveFile={archive.absolute()}"],
+        profile_dir=profile_dir,
+        capture=capture,
+        limits=limits,
+        classpath=archive.parent / JAR_NAME,
+    )
+
+
+def package(bin_dir: Path, jar: Path, debug: bool = False) -> bool:
+    try:
+        p = subprocess.run(
+            ["jar", "cf", str(jar.absolute()), "-C", str(bin_dir.absolute()), "."],
+            capture_output=True,
+            text=True,
+        )
+    except OSError as e:
+        p = None
+        if debug:
+            print(e)
+    if p is None or p.returncode != 0 or not jar.exists():
+        print("Packaging the compiled classes failed, not building a CDS archive")
+        if debug and p is not None:
+            print(p.stdout + p.stderr)
+        return False
+    return True
+
+
+def build_archive(
+    testset: TestSet,
+    proj_dir: Path,
+    bin_dir: Path,
+    timeout: float,
+    debug: bool = False,
+) -> "Path | None":
+    # Removed with remove_archive once the run is done with it
+    run_dir = CDS_DIR / str(os.getpid())
+    shutil.rmtree(run_dir, ignore_errors=True)
+    run_dir.mkdir(parents=True)
+    archive = run_dir / "translate.jsa"
+    class_list = run_dir / "classes.lst"
+    jar = run_dir / JAR_NAME
+    if not package(bin_dir, jar, debug):
+        shutil.rmtree(run_dir, ignore_errors=True)
+        return None
+    classes: "set[str]" = set()
+    with tempfile.TemporaryDirectory(prefix="rw214-cds-") as tmp:
+        lane = make_lane(proj_dir, Path(tmp) / "lane")
+        for n, (testcase, direction) in enumerate(training_set(testset)):
+            dump = Path(tmp) / f"{n}.lst"
+            options = LaunchOptions(
+                jvm_args=[f"-XX:DumpLoadedClassList={dump.absolute()}"],
+                classpath=jar,
+            )
+            invocation = launch(
+                options.command(
+                    bin_dir,
+                    direction,
+                    testcase.level,
+                    testcase.root / testcase.CONTEXTS[direction]["input"],
+                    testcase.root.name,
+                ),
+                cwd=lane,
+                timeout=timeout,
+            )
+            if debug:
+                print(f"Training run {testcase.name} @ {direction.to_abv()}:", end=" ")
+                print("ok" if invocation.ok else "failed")
+            if dump.exists():
+                classes.update(dump.read_text().splitlines())
+    if not classes:
+        print("Training runs loaded no classes, not building a CDS archive")
+        shutil.rmtree(run_dir, ignore_errors=True)
+        return None
+    class_list.write_text("\n".join(sorted(classes)) + "\n")
+    p = subprocess.run(
+        [
+            "java",
+            "-Xshare:dump",
+            f"-XX:SharedClassListFile={class_list.absolute()}",
+            f"-XX:SharedArchiveFile={archive.absolute()}",
+            "-cp",
+            str(jar.absolute()),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if p.returncode != 0 or not archive.exists():
+        print("Building the CDS archive failed")
+        if debug:
+            print(p.stdout + p.stderr)
+        shutil.rmtree(run_dir, ignore_errors=True)
+        return None
+    print(f"Built CDS archive from {len(classes)} classes")
+    return archive
+
+
+def remove_archive(archive: Path) -> None:
+    # The archive's directory, with the jar and class list it was built from
+    shutil.rmtree(archive.parent, ignore_errors=True)
+
+
+def compare_startup(
+    testset: TestSet,
+    proj_dir: Path,
+    bin_dir: Path,
+    timeout: float,
+    archive: Path,
+    rounds: int = 3,
+) -> str:
+    # All load the classes from the same jar, so only the flags differ
+    jar = archive.parent / JAR_NAME
+    configs = {
+        "Default": LaunchOptions(classpath=jar),
+        "Startup flags": LaunchOptions(jvm_args=STARTUP_FLAGS, classpath=jar),
+        "Startup flags + CDS": archive_options(archive),
+    }
+    times: "dict[str, list[float]]" = {name: [] for name in configs}
+    with tempfile.TemporaryDirectory(prefix="rw214-cds-") as tmp:
+        lane = make_lane(proj_dir, Path(tmp) / "lane")
+        # Interleave the configurations so host noise affects them equally
+        for _ in range(rounds):
+            for testcase, direction in training_set(testset):
+                for name, options in configs.items():
+                    invocation = launch(
+                        options.command(
+                            bin_dir,
+                            direction,
+                            testcase.level,
+                            testcase.root / testcase.CONTEXTS[direction]["input"],
+                            testcase.root.name,
+                        ),
+                        cwd=lane,
+                        timeout=timeout,
+                    )
+                    if invocation.ok:
+                        times[name].append(invocation.wall)
+    baseline = statistics.median(times["Default"]) if times["Default"] else None
+    rows: "list[list[str]]" = [["Launch", "Runs", "Median", "Mean", "Speedup"]]
+    for name, values in times.items():
+        if not values:
+            rows.append([name, "0", "-", "-", "-"])
+            continue
+        median = statistics.median(values)
+        rows.append(
+            [
+                name,
+                str(len(values)),
+                f"{median * 1000:.0f} ms",
+                f"{statistics.mean(values) * 1000:.0f} ms",
+                f"{baseline / median:.2f}x" if baseline else "-",
+            ]
+        )
+    return TableMaker(rows)
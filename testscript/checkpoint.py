@@ -0,0 +1,130 @@
+import datetime
+import json
+import secrets
+import shutil
+from typing import Any
+
+from common import STATE_DIR
+from launcher import Invocation
+from output_compare import Output
+
+RUNS_DIR = STATE_DIR / "runs"
+
+
+class Checkpoint:
+    # Every finished invocation of a run, appended to a log in the run's own
+    # directory as soon as it is collected, so an interrupted run can resume.
+    # Invocations are keyed by (case, direction) and the invocation key, so
+    # outcomes for inputs that have since changed are not reused.
+    def __init__(self, run_id: str, build: str) -> None:
+        self.run_id = run_id
+        self.dir = RUNS_DIR / run_id
+        self.build = build
+        self.done: "dict[tuple[str, str], tuple[str, dict[str, Any]]]" = {}
+        self.file = None
+
+    @staticmethod
+    def create(project: str, build: str) -> "Checkpoint":
+        # Suffixed so that runs started in the same second get their own IDs
+        checkpoint = Checkpoint(
+            datetime.datetime.now().strftime("%Y%m%d-%H%M%S-") + secrets.token_hex(3),
+            build,
+        )
+        checkpoint.dir.mkdir(parents=True)
+        with open(checkpoint.dir / "meta.json", "w") as f:
+            json.dump(
+                {
+                    "project": project,
+                    "build_hash": build,
+                    "started": datetime.datetime.now().isoformat(timespec="seconds"),
+                },
+                f,
+                indent=2,
+            )
+        return checkpoint
+
+    @staticmethod
+    def resume(run_id: str, build: str) -> "Checkpoint":
+        # Raises ValueError if the run cannot be resumed with this build
+        checkpoint = Checkpoint(run_id, build)
+        try:
+            with open(checkpoint.dir / "meta.json", "r") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"No run '{run_id}' to resume in {RUNS_DIR}") from None
+        if meta["build_hash"] != build:
+            raise ValueError(
+                f"Run '{run_id}' tested build {meta['build_hash']},"
+                f" but the sources are now build {build}"
+            )
+        log = checkpoint.dir / "invocations.jsonl"
+        if log.exists():
+            with open(log, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Cut short when the run was killed
+                        continue
+                    for case, direction in record["members"]:
+                        checkpoint.done[(case, direction)] = (
+                            record["key"],
+                            record["outcome"],
+                        )
+        return checkpoint
+
+    def lookup(
+        self, case: str, direction: str, key: str
+    ) -> "tuple[Invocation, Output | None, str | None] | None":
+        entry = self.done.get((case, direction))
+        if entry is None or entry[0] != key:
+            return None
+        outcome = entry[1]
+        return (
+            Invocation(**outcome["invocation"]),
+            (
+                Output.from_text(outcome["recieved"])
+                if outcome["recieved"] is not None
+                else None
+            ),
+            outcome["error"],
+        )
+
+    def save(
+        self,
+        members: "list[tuple[str, str]]",
+        key: str,
+        outcome: "tuple[Invocation, Output | None, str | None]",
+    ) -> None:
+        invocation, output, error = outcome
+        recieved = None
+        if output is not None:
+            try:
+                recieved = output.text()
+            except UnicodeDecodeError:
+                error = "UnicodeDecodeError"
+        if self.file is None:
+            self.file = open(self.dir / "invocations.jsonl", "a", encoding="utf-8")
+        record = {
+            "members": members,
+            "key": key,
+            "outcome": {
+                "invocation": {
+                    **invocation.to_dict(),
+                    "args": invocation.args,
+                    "out": invocation.out,
+                    "err": invocation.err,
+                },
+                "recieved": recieved,
+                "error": error,
+            },
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self, finished: bool) -> None:
+        # A run that finished has nothing left to resume
+        if self.file is not None:
+            self.file.close()
+        if finished:
+            shutil.rmtree(self.dir, ignore_errors=True)
@@ -1,10 +1,14 @@
 import difflib
 import enum
 import re
-from typing import Literal
+from pathlib import Path
+from typing import Literal, Optional, Tuple
 
 COLOR_ENABLED = True
 
+# Local state kept between runs (timings, history), relative to the repository root
+STATE_DIR = Path("./.testscript")
+
 ALLOWED_TAGS = set(
     [
         "text",
@@ -17,6 +21,9 @@ ALLOWED_TAGS = set(
     ]
 )
 
+# Lowest and highest valid testcase level
+LEVEL_RANGE = (0.0, 4.1)
+
 
 def set_color_enabled(enabled: bool) -> None:
     global COLOR_ENABLED
@@ -52,6 +59,9 @@ class Status(enum.Enum):
     PASSED = enum.auto()
     FAILED = enum.auto()
     COMPLETE = enum.auto()
+    OVER_BUDGET = enum.auto()
+    SKIPPED = enum.auto()
+    LIMIT_EXCEEDED = enum.auto()
 
 
 class bcolor(enum.Enum):
@@ -73,43 +83,56 @@ def colorize(text: str, color: Literal["red", "green"], omit_ends: bool = False)
         return text
 
 
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*?m")
+
+# A run of text in a single colour, or uncoloured if the colour is None
+Span = Tuple[str, Optional[Literal["red", "green"]]]
+
+
 class ColoredString(str):
+    # len() is the display width, without colour codes. It is computed once,
+    # directly from the spans when built with from_spans.
+    _width: "int | None" = None
+
+    @classmethod
+    def from_spans(cls, spans: "list[Span]") -> "ColoredString":
+        ret = cls(
+            "".join(
+                colorize(text, color, omit_ends=True) if color else text
+                for text, color in spans
+            )
+            + (bcolor.ENDC.value if COLOR_ENABLED else "")
+        )
+        ret._width = sum(len(text) for text, _ in spans)
+        return ret
+
     def __len__(self) -> int:
-        return len(re.sub(r"\x1b\[[0-9;]*?m", "", self))
+        if self._width is None:
+            self._width = len(ANSI_ESCAPE.sub("", self))
+        return self._width
 
 
 def ex_v_fd(ex: str, fd: str) -> "tuple[str, str]":
     ex = ex.replace("\r\n", "\n").replace("\n", r"\n")
     fd = fd.replace("\r\n", "\n").replace("\n", r"\n")
+    ex_spans: "list[Span]" = []
+    fd_spans: "list[Span]" = []
 
-    def get_match(ex: str, fd: str) -> "tuple[str, str]":
+    def get_match(ex: str, fd: str) -> None:
+        # Appends the spans of ex and fd in order: unmatched text in red,
+        # the longest common block in green, recursing on either side of it
         matcher = difflib.SequenceMatcher()
         matcher.set_seq1(ex)
         matcher.set_seq2(fd)
         mid = matcher.find_longest_match(0, len(ex), 0, len(fd))
         if mid.size == 0:
-            return (
-                colorize(ex.ljust(max(len(ex), len(fd))), "red", omit_ends=True),
-                colorize(fd.ljust(max(len(ex), len(fd))), "red", omit_ends=True),
-            )
+            ex_spans.append((ex.ljust(max(len(ex), len(fd))), "red"))
+            fd_spans.append((fd.ljust(max(len(ex), len(fd))), "red"))
         else:
-            l_ex, l_fd = get_match(ex[: mid.a], fd[: mid.b])
-            r_ex, r_fd = get_match(ex[mid.a + mid.size :], fd[mid.b + mid.size :])
-            return (
-                (
-                    l_ex
-                    + colorize(ex[mid.a : mid.a + mid.size], "green", omit_ends=True)
-                    + r_ex
-                ),
-                (
-                    l_fd
-                    + colorize(fd[mid.b : mid.b + mid.size], "green", omit_ends=True)
-                    + r_fd
-                ),
-            )
+            get_match(ex[: mid.a], fd[: mid.b])
+            ex_spans.append((ex[mid.a : mid.a + mid.size], "green"))
+            fd_spans.append((fd[mid.b : mid.b + mid.size], "green"))
+            get_match(ex[mid.a + mid.size :], fd[mid.b + mid.size :])
 
-    a, b = (
-        ColoredString(x + (bcolor.ENDC.value if COLOR_ENABLED else ""))
-        for x in get_match(ex, fd)
-    )
-    return (a, b)
+    get_match(ex, fd)
+    return ColoredString.from_spans(ex_spans), ColoredString.from_spans(fd_spans)
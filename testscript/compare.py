@@ -0,0 +1,195 @@
+import math
+import random
+import statistics
+import subprocess
+import sys
+
+from args import CompareArgs
+from build import finish_build, start_build
+from common import Direction
+from output_compare import Output, first_difference
+from table_maker import TableMaker
+from test_prog import load_testcases, resolve_project
+
+BOOTSTRAP_SAMPLES = 2000
+
+
+def rank_sum_test(a: "list[float]", b: "list[float]") -> float:
+    # Two-sided p-value of the Mann-Whitney U test, by the normal approximation
+    # with a correction for ties
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    values = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+    ranks = [0.0] * len(values)
+    ties = 0.0
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        ties += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    u = sum(r for r, (_, group) in zip(ranks, values) if group == 0) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return min(math.erfc(max(z, 0) / math.sqrt(2)), 1.0)
+
+
+def holm(pvalues: "list[float]") -> "list[float]":
+    # Holm-Bonferroni adjusted p-values, so that testing every case at once
+    # does not turn chance differences into verdicts
+    order = sorted(range(len(pvalues)), key=lambda i: pvalues[i])
+    adjusted = [1.0] * len(pvalues)
+    running = 0.0
+    for rank, i in enumerate(order):
+        running = max(running, min((len(pvalues) - rank) * pvalues[i], 1.0))
+        adjusted[i] = running
+    return adjusted
+
+
+def speedup_interval(
+    a: "list[float]", b: "list[float]", confidence: float, seed: int = 0
+) -> "tuple[float, float]":
+    # Percentile bootstrap interval of median(a) / median(b)
+    rng = random.Random(seed)
+    ratios = sorted(
+        statistics.median(rng.choices(a, k=len(a)))
+        / statistics.median(rng.choices(b, k=len(b)))
+        for _ in range(BOOTSTRAP_SAMPLES)
+    )
+    tail = (1 - confidence) / 2
+    return (
+        ratios[int(tail * (len(ratios) - 1))],
+        ratios[int((1 - tail) * (len(ratios) - 1))],
+    )
+
+
+def compare(args: CompareArgs):
+    proj_a = resolve_project(args.proj_a, args.debug)
+    proj_b = resolve_project(args.proj_b, args.debug)
+    if proj_a is None or proj_b is None:
+        return
+    if proj_a == proj_b:
+        print("Both builds are the same project directory")
+        sys.exit(1)
+
+    # Build both projects at once, loading the testcases in the meantime
+    builds = [start_build(proj_a, args.debug), start_build(proj_b, args.debug)]
+    testcases = load_testcases(args.debug)
+    if not all([finish_build(build, args.debug) for build in builds]):
+        return
+
+    projects = {"A": proj_a, "B": proj_b}
+    times: "dict[tuple[str, Direction], dict[str, list[float]]]" = {}
+    outputs: "dict[tuple[str, Direction], dict[str, Output | None]]" = {}
+    errors = {"A": 0, "B": 0}
+    pairs = [
+        (testcase, direction)
+        for testcase in testcases
+        for direction in (Direction.B2T, Direction.T2B)
+    ]
+    print(f"Running {len(pairs)} translations on each build, {args.rounds} rounds...")
+    for n in range(args.rounds):
+        for m, (testcase, direction) in enumerate(pairs):
+            key = (testcase.root.name, direction)
+            times.setdefault(key, {"A": [], "B": []})
+            # Alternate which build goes first, so drift in the host's speed
+            # affects both equally
+            for build in ("A", "B") if (n + m) % 2 == 0 else ("B", "A"):
+                invocation, output, error = testcase.execute(
+                    direction,
+                    projects[build],
+                    projects[build] / "bin",
+                    args.timeout,
+                    debug=args.debug,
+                )
+                if invocation.ok and error is None:
+                    times[key][build].append(invocation.wall)
+                else:
+                    errors[build] += 1
+                if n == 0:
+                    outputs.setdefault(key, {})[build] = output
+                elif output is not None:
+                    output.discard()
+        print(f"Round {n + 1}/{args.rounds} complete")
+
+    rows: "list[list[str]]" = [
+        [
+            "Testcase",
+            "Direction",
+            "A",
+            "B",
+            "Speedup",
+            f"{args.confidence:.0%} CI",
+            "p (adj.)",
+            "",
+        ]
+    ]
+    measured = {key: s for key, s in times.items() if s["A"] and s["B"]}
+    pvalues = dict(
+        zip(
+            measured,
+            holm([rank_sum_test(s["A"], s["B"]) for s in measured.values()]),
+        )
+    )
+    speedups = []
+    for (case, direction), samples in times.items():
+        a, b = samples["A"], samples["B"]
+        if (case, direction) not in measured:
+            rows.append([case, direction.name, "-", "-", "-", "-", "-", "no runs"])
+            continue
+        speedup = statistics.median(a) / statistics.median(b)
+        low, high = speedup_interval(a, b, args.confidence)
+        p = pvalues[(case, direction)]
+        speedups.append(speedup)
+        verdict = ""
+        if p < 1 - args.confidence:
+            verdict = "B faster" if speedup > 1 else "B slower"
+        rows.append(
+            [
+                case,
+                direction.name,
+                f"{statistics.median(a) * 1000:.0f} ms",
+                f"{statistics.median(b) * 1000:.0f} ms",
+                f"{speedup:.2f}x",
+                f"{low:.2f}x - {high:.2f}x",
+                f"{p:.3f}",
+                verdict,
+            ]
+        )
+    print(TableMaker(rows))
+    if speedups:
+        overall = math.exp(statistics.mean(math.log(s) for s in speedups))
+        print(f"Geometric mean speedup of B over A: {overall:.2f}x")
+    for build in ("A", "B"):
+        if errors[build]:
+            print(f"{errors[build]} translations failed or timed out on build {build}")
+
+    mismatches = []
+    for (case, direction), output in outputs.items():
+        a, b = output.get("A"), output.get("B")
+        if a is None or b is None:
+            if a is not b:
+                mismatches.append([case, direction.name, "no output"])
+        else:
+            with a.open() as fa, b.open() as fb:
+                difference = first_difference(fa, fb)
+            if difference is not None:
+                mismatches.append([case, direction.name, str(difference)])
+        for build in (a, b):
+            if build is not None:
+                build.discard()
+    if mismatches:
+        print(f"{len(mismatches)} translations differ between the builds")
+        print(TableMaker([["Testcase", "Direction", "First difference"]] + mismatches))
+    else:
+        print("Both builds produce the same output for every testcase")
+
+    for proj in projects.values():
+        subprocess.run(["rm", "-rf", proj / "bin"], check=True)
@@ -0,0 +1,317 @@
+import collections
+import json
+import socket
+import socketserver
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from args import CoordinatorArgs, WorkerArgs
+from build import finish_build, start_build
+from common import Direction
+from launcher import Invocation
+from output_compare import Output
+from report_formatter import TableFormatter
+from scheduler import DurationHistory, schedule
+from test_prog import load_testcases, resolve_project
+from testcase import Testcase, TestSet, make_lane
+
+# Messages are single lines of JSON. A worker sends {"op": "next"} and gets a
+# job, {"op": "done"} once every job has a result, or nothing while it waits
+# for jobs still running elsewhere that may yet be requeued. It answers a job
+# with {"op": "result", ...} and then asks for the next one.
+
+# Extra time a worker has to report back beyond the translator timeout before
+# the coordinator gives up on it and requeues its job
+WORKER_GRACE = 30
+
+
+def send(stream: BinaryIO, message: "dict[str, Any]") -> None:
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def receive(stream: BinaryIO) -> "dict[str, Any] | None":
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class JobQueue:
+    # The coordinator's shared state: jobs waiting to be handed out, and the
+    # jobs each connected worker is running
+    def __init__(
+        self, testset: TestSet, plan: "list[list[tuple[Testcase, Direction]]]"
+    ):
+        self.testset = testset
+        self.plan = plan
+        self.pending: "collections.deque[int]" = collections.deque(range(len(plan)))
+        self.running: "dict[int, int]" = {}  # job -> worker
+        self.tokens: "dict[int, int]" = {}  # job -> progress token
+        self.left = len(plan)
+        self.requeued = 0
+        self.condition = threading.Condition()
+        self.finished = threading.Event()
+        if not plan:
+            self.finished.set()
+
+    def take(self, worker: int) -> "int | None":
+        # Blocks until a job is free, or returns None once every job is done
+        with self.condition:
+            while not self.pending and self.left:
+                self.condition.wait()
+            if not self.left:
+                return None
+            job = self.pending.popleft()
+            self.running[job] = worker
+            assert self.testset.progress is not None
+            testcase, direction = self.plan[job][0]
+            self.tokens[job] = self.testset.progress.launch(
+                f"{testcase.name} @ {direction.to_abv()} (worker {worker})"
+            )
+            return job
+
+    def complete(
+        self, job: int, outcome: "tuple[Invocation, Output | None, str | None]"
+    ):
+        with self.condition:
+            if self.running.pop(job, None) is None:
+                # Already requeued and run by another worker
+                return
+            self.land(job)
+            self.testset.collect(self.plan[job], outcome)
+            self.left -= 1
+            if not self.left:
+                self.finished.set()
+                self.condition.notify_all()
+
+    def release(self, worker: int):
+        # Put the jobs of a disconnected worker back at the front of the queue
+        with self.condition:
+            jobs = [job for job, owner in self.running.items() if owner == worker]
+            for job in jobs:
+                del self.running[job]
+                self.land(job)
+                self.pending.appendleft(job)
+            self.requeued += len(jobs)
+            if jobs:
+                self.condition.notify_all()
+
+    def land(self, job: int):
+        assert self.testset.progress is not None
+        self.testset.progress.land(self.tokens.pop(job))
+
+    def log(self, line: str):
+        # Printed above the coordinator's progress view
+        assert self.testset.progress is not None
+        self.testset.progress.log(line)
+
+
+class Coordinator(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: "tuple[str, int]", jobs: JobQueue, timeout: float):
+        super().__init__(address, WorkerHandler)
+        self.jobs = jobs
+        self.job_timeout = timeout
+        self.workers = 0
+        self.lock = threading.Lock()
+
+    def job_message(self, job: int) -> "dict[str, Any]":
+        testcase, direction = self.jobs.plan[job][0]
+        return {
+            "op": "job",
+            "job": job,
+            "case": testcase.root.name,
+            "direction": direction.to_abv(),
+            "key": testcase.invocation_key(direction),
+            "timeout": self.job_timeout,
+        }
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    server: Coordinator
+
+    def handle(self):
+        with self.server.lock:
+            self.server.workers += 1
+            worker = self.server.workers
+        peer = "%s:%d" % self.client_address
+        self.server.jobs.log(f"Worker {worker} connected from {peer}")
+        self.request.settimeout(self.server.job_timeout + WORKER_GRACE)
+        try:
+            while True:
+                message = receive(self.rfile)
+                if message is None:
+                    break
+                if message["op"] == "result":
+                    self.server.jobs.complete(
+                        message["job"],
+                        (
+                            Invocation(**message["invocation"]),
+                            (
+                                Output.from_text(message["recieved"])
+                                if message["recieved"] is not None
+                                else None
+                            ),
+                            message["error"],
+                        ),
+                    )
+                elif message["op"] == "next":
+                    job = self.server.jobs.take(worker)
+                    if job is None:
+                        send(self.wfile, {"op": "done"})
+                        break
+                    send(self.wfile, self.server.job_message(job))
+        except (OSError, ValueError, KeyError) as e:
+            self.server.jobs.log(f"Worker {worker} failed: {e}")
+        finally:
+            self.server.jobs.release(worker)
+            self.server.jobs.log(f"Worker {worker} disconnected")
+
+
+def coordinator(args: CoordinatorArgs):
+    testcases = load_testcases(args.debug)
+    history = DurationHistory()
+    testcases = TestSet(schedule(list(testcases), history, args.failed_first))
+    jobs = JobQueue(testcases, testcases.begin(args.dedup))
+    with Coordinator((args.host, args.port), jobs, args.timeout) as server:
+        host, port = server.server_address[:2]
+        jobs.log(
+            f"Serving {len(jobs.plan)} jobs for {len(testcases)} testcases on {host}:{port}"
+        )
+        jobs.log(
+            "Start workers with:"
+            f" python testscript worker <project> --host {host} --port {port}"
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            jobs.finished.wait()
+        except KeyboardInterrupt:
+            assert testcases.progress is not None
+            testcases.progress.close()
+            print("Interrupted, results are incomplete")
+            server.shutdown()
+            return
+        server.shutdown()
+    testcases.end()
+    if jobs.requeued:
+        print(f"Requeued {jobs.requeued} jobs from disconnected workers")
+    history.record(testcases)
+    history.save()
+
+    for chunk in TableFormatter().iter_format(
+        testcases, args.show_passing, args.details, args.error_output
+    ):
+        print(chunk, end="")
+    print()
+
+
+def run_job(
+    message: "dict[str, Any]",
+    testcases: "dict[str, Testcase]",
+    proj_dir: Path,
+    lane: Path,
+    debug: bool = False,
+) -> "dict[str, Any]":
+    direction = Direction.from_str(message["direction"])
+    testcase = testcases.get(message["case"])
+    error = None
+    if testcase is None:
+        error = f"Testcase '{message['case']}' not found on worker"
+    elif testcase.invocation_key(direction) != message["key"]:
+        error = f"Testcase '{message['case']}' differs from the coordinator's copy"
+    recieved = None
+    if testcase is None or error is not None:
+        invocation = Invocation([], None, "", error or "", 0.0)
+    else:
+        invocation, output, error = testcase.execute(
+            direction,
+            proj_dir,
+            proj_dir / "bin",
+            message["timeout"],
+            debug=debug,
+            work_dir=lane,
+        )
+        if output is not None:
+            # Sent as text, so the coordinator needs no access to the file
+            try:
+                recieved = output.text()
+            except UnicodeDecodeError:
+                error = "UnicodeDecodeError"
+            output.discard()
+    return {
+        "op": "result",
+        "job": message["job"],
+        "invocation": {
+            **invocation.to_dict(),
+            "args": invocation.args,
+            "out": invocation.out,
+            "err": invocation.err,
+        },
+        "recieved": recieved,
+        "error": error,
+    }
+
+
+def work_loop(
+    address: "tuple[str, int]",
+    testcases: "dict[str, Testcase]",
+    proj_dir: Path,
+    lane: Path,
+    debug: bool = False,
+) -> int:
+    # Pull jobs over one connection until the coordinator runs out
+    done = 0
+    with socket.create_connection(address) as sock:
+        stream = sock.makefile("rwb")
+        while True:
+            send(stream, {"op": "next"})
+            message = receive(stream)
+            if message is None or message["op"] == "done":
+                break
+            result = run_job(message, testcases, proj_dir, lane, debug)
+            send(stream, result)
+            done += 1
+            print(
+                f"Ran {message['case']} @ {message['direction']}:"
+                f" {'ok' if result['error'] is None else result['error']}"
+            )
+    return done
+
+
+def worker(args: WorkerArgs):
+    proj_dir = resolve_project(args.proj, args.debug)
+    if proj_dir is None:
+        return
+    build = start_build(proj_dir, args.debug)
+    testcases = {
+        testcase.root.name: testcase for testcase in load_testcases(args.debug)
+    }
+    if not finish_build(build, args.debug):
+        return
+    print(f"Connecting {args.jobs} worker(s) to {args.host}:{args.port}")
+    try:
+        with tempfile.TemporaryDirectory(prefix="rw214-worker-") as lanes_root:
+            with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+                counts = pool.map(
+                    lambda n: work_loop(
+                        (args.host, args.port),
+                        testcases,
+                        proj_dir,
+                        make_lane(proj_dir, Path(lanes_root) / str(n)),
+                        args.debug,
+                    ),
+                    range(args.jobs),
+                )
+                print(f"Ran {sum(counts)} jobs, coordinator has no more work")
+    except OSError as e:
+        print(f"Lost connection to the coordinator: {e}")
+    finally:
+        subprocess.run(["rm", "-rf", proj_dir / "bin"], check=True)
@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator
+
+from args import ImportArgs
+from common import ALLOWED_TAGS, LEVEL_RANGE
+
+FIELDS = ["name", "desc", "level", "tags", "afrikaans", "braille"]
+
+
+def read_records(path: Path, fmt: str) -> "Iterator[tuple[int, Any]]":
+    # (line number, record) for every record in the file
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for n, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield n, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield n, f"Invalid JSON: {e.msg}"
+
+
+def folder_name(name: str) -> str:
+    # The same folder name 'create' uses
+    return name.lower().replace(" ", "-")
+
+
+def parse_tags(tags: Any) -> Any:
+    # CSV tags are colon separated, as for 'create -t'
+    if isinstance(tags, str):
+        return [tag.strip().lower() for tag in tags.split(":") if tag.strip()]
+    return tags
+
+
+def check_record(record: Any, testcase_dir: Path) -> "list[str]":
+    # Everything Testcase.validate would reject, plus testcases that exist already
+    if not isinstance(record, dict):
+        return [record if isinstance(record, str) else "Record is not an object"]
+    errors = []
+    for field in FIELDS:
+        if field == "tags":
+            continue
+        if not isinstance(record.get(field), str):
+            errors.append(f"Missing or invalid '{field}'")
+    if errors:
+        return errors
+    try:
+        if not LEVEL_RANGE[0] <= float(record["level"]) <= LEVEL_RANGE[1]:
+            errors.append(f"Invalid level: {record['level']}")
+    except ValueError:
+        errors.append(f"Invalid level: {record['level']}")
+    tags = parse_tags(record.get("tags") or [])
+    if not isinstance(tags, list):
+        errors.append("Invalid tags")
+    else:
+        errors += [
+            f"Invalid tag: {tag}"
+            for tag in tags
+            if not isinstance(tag, str) or tag not in ALLOWED_TAGS
+        ]
+    if not record["afrikaans"].strip() or not record["braille"].strip():
+        errors.append("Test file(s) empty")
+    folder = folder_name(record["name"])
+    # The folder must be a single path component inside testcases/
+    if (
+        not folder.strip("-.")
+        or "/" in folder
+        or "\\" in folder
+        or folder in (".", "..")
+        or Path(folder).name != folder
+    ):
+        errors.append(f"Invalid name: {record['name']}")
+    elif (testcase_dir / folder).exists():
+        errors.append(f"Testcase '{folder}' already exists")
+    return errors
+
+
+def write_testcase(record: "dict[str, Any]", folder: Path) -> None:
+    folder.mkdir()
+    (folder / "afr.txt").write_text(record["afrikaans"], encoding="utf-8")
+    (folder / "brf.brf").write_text(record["braille"], encoding="utf-8")
+    with open(folder / "manifest.json", "w") as f:
+        json.dump(
+            {
+                "$schema": "../schema.json",
+                "name": record["name"],
+                "desc": record["desc"],
+                "level": record["level"],
+                "tags": parse_tags(record.get("tags") or []),
+            },
+            f,
+            indent=2,
+        )
+
+
+def import_cases(args: ImportArgs):
+    testcase_dir = Path("./testcases").resolve(strict=True)
+    fmt = args.format or ("csv" if args.file.suffix.lower() == ".csv" else "jsonl")
+    try:
+        records = list(read_records(args.file, fmt))
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"Could not read {args.file}: {e}")
+        sys.exit(1)
+    print(f"Validating {len(records)} records...")
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(
+            pool.map(lambda item: check_record(item[1], testcase_dir), records)
+        )
+    # Collisions between records can only be found once all are read
+    seen: "dict[str, int]" = {}
+    for (line, record), errors in zip(records, results):
+        if errors:
+            continue
+        name = folder_name(record["name"])
+        if name in seen:
+            errors.append(f"Testcase '{name}' also defined on line {seen[name]}")
+        seen.setdefault(name, line)
+
+    bad = [(line, errors) for (line, _), errors in zip(records, results) if errors]
+    for line, errors in bad:
+        for error in errors:
+            print(f"Line {line}: {error}")
+    if bad:
+        print(f"{len(bad)} of {len(records)} records are invalid, nothing imported")
+        sys.exit(1)
+    if args.dry_run:
+        print(f"All {len(records)} records are valid")
+        return
+
+    # Write everything into a staging folder first, so a failed import leaves
+    # no half-written testcases behind, then move the testcases into place
+    with tempfile.TemporaryDirectory(prefix=".import-", dir=testcase_dir) as tmp:
+        staging = Path(tmp)
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            list(
+                pool.map(
+                    lambda record: write_testcase(
+                        record, staging / folder_name(record["name"])
+                    ),
+                    (record for _, record in records),
+                )
+            )
+        for folder in staging.iterdir():
+            os.replace(folder, testcase_dir / folder.name)
+    print(f"Imported {len(records)} testcases into {testcase_dir}")
@@ -0,0 +1,422 @@
+import os
+import selectors
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Literal
+
+import tracer
+from common import Direction
+
+try:
+    import resource
+
+    RESOURCE_FOUND = True
+except ImportError:
+    RESOURCE_FOUND = False
+
+# Resource limits by option name: the rlimit, the signal the kernel kills a
+# process with for exceeding it, and what the JVM prints when it catches the
+# failure itself instead. An address space limit shows up as native allocations
+# failing; OutOfMemoryError for the Java heap or metaspace comes from the JVM's
+# own limits (-Xmx), so it is a translator error, not a breach.
+LIMITS: "dict[str, tuple[str, str | None, list[str]]]" = {
+    "memory": (
+        "RLIMIT_AS",
+        None,
+        [
+            "Could not reserve enough space",
+            "Cannot allocate memory",
+            "insufficient memory",
+            "Native memory allocation",
+            "unable to create native thread",
+        ],
+    ),
+    "cpu": ("RLIMIT_CPU", "SIGXCPU", []),
+    "files": ("RLIMIT_NOFILE", None, ["Too many open files"]),
+    "output": ("RLIMIT_FSIZE", "SIGXFSZ", ["File too large"]),
+}
+
+
+class Invocation:
+    def __init__(
+        self,
+        args: "list[str]",
+        returncode: "int | None",
+        out: str,
+        err: str,
+        wall: float,
+        cpu: "float | None" = None,
+        rss: "int | None" = None,
+        timed_out: bool = False,
+        cancelled: bool = False,
+        limit: "str | None" = None,
+    ):
+        self.args = args
+        self.returncode = returncode
+        self.out = out
+        self.err = err
+        self.wall = wall
+        self.cpu = cpu
+        self.rss = rss  # peak resident set size in KiB
+        self.timed_out = timed_out
+        self.cancelled = cancelled  # killed because the run was stopped
+        self.limit = limit  # the rlimit the translator exceeded, if any
+
+    @property
+    def ok(self) -> bool:
+        return (
+            not self.timed_out
+            and not self.cancelled
+            and self.limit is None
+            and self.returncode == 0
+        )
+
+    def to_dict(
+        self,
+    ) -> 'dict[Literal["returncode","wall","cpu","rss","timed_out","cancelled","limit"], Any]':
+        return {
+            "returncode": self.returncode,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "rss": self.rss,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "limit": self.limit,
+        }
+
+
+def translator_command(
+    bin_dir: Path,
+    direction: Direction,
+    level: str,
+    input_path: Path,
+    jvm_args: "list[str] | None" = None,
+) -> "list[str]":
+    return [
+        "java",
+        *(jvm_args or []),
+        "-cp",
+        str(bin_dir.absolute()),
+        "src.Translate",
+        "noGUI",
+        direction.to_abv(),
+        level,
+        str(input_path.absolute()),
+    ]
+
+
+class LaunchOptions:
+    # How translator invocations are launched, shared by every testcase in a run
+    def __init__(
+        self,
+        jvm_args: "list[str] | None" = None,
+        profile_dir: "Path | None" = None,
+        capture: 'Literal["file", "pipe"]' = "file",
+        limits: "dict[str, int] | None" = None,
+        cpus: "set[int] | None" = None,
+        classpath: "Path | None" = None,
+    ):
+        self.jvm_args: "list[str]" = jvm_args or []
+        # Used in place of the binary directory, such as a jar of its classes
+        self.classpath = classpath
+        self.profile_dir = profile_dir.absolute() if profile_dir else None
+        # Pipe capture relies on Linux's named pipe semantics
+        self.capture = capture if sys.platform.startswith("linux") else "file"
+        # Keyed by LIMITS names, in bytes, seconds or a count
+        self.limits: "dict[str, int]" = limits or {}
+        if self.limits and not RESOURCE_FOUND:
+            print("Resource limits are not supported on this platform, ignoring them.")
+            self.limits = {}
+        self.cpus = cpus  # cores the translator is pinned to, on Linux
+
+    def recording(self, label: str, direction: Direction) -> Path:
+        assert self.profile_dir is not None
+        return self.profile_dir / f"{label}-{direction.to_abv()}.jfr"
+
+    def command(
+        self,
+        bin_dir: Path,
+        direction: Direction,
+        level: str,
+        input_path: Path,
+        label: str,
+    ) -> "list[str]":
+        jvm_args = list(self.jvm_args)
+        if self.profile_dir is not None:
+            recording = self.recording(label, direction)
+            if recording.exists():
+                recording.unlink()
+            jvm_args += [
+                f"-XX:StartFlightRecording=filename={recording},settings=profile,dumponexit=true",
+                "-Xlog:jfr+startup=warning",
+            ]
+        return translator_command(
+            self.classpath or bin_dir, direction, level, input_path, jvm_args
+        )
+
+
+class OutputPipe:
+    # A named pipe in place of the translator's output file. launch() reads it
+    # alongside stdout and stderr while the translator runs, so the output
+    # never touches the disk.
+    def __init__(self, path: Path):
+        self.path = path
+        os.mkfifo(path)
+        # Opening the read end without blocking lets the translator open the
+        # pipe for writing at any time
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        self.chunks: "list[bytes]" = []
+        self.opened = False  # whether the translator opened the pipe
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read(self) -> bool:
+        # Read what the translator wrote. Returns False once the pipe is gone,
+        # replaced by a file of the translator's own.
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return True
+        self.opened = True
+        if data:
+            self.chunks.append(data)
+            return True
+        # The translator closed the file; reopen to catch it opening it again
+        if not self.path.is_fifo():
+            return False
+        fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        os.close(self.fd)
+        self.fd = fd
+        return True
+
+    def close(self) -> "bytes | None":
+        # Call once the translator has exited. Returns what it wrote, or None
+        # if it never opened the pipe.
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            self.opened = True
+            self.chunks.append(data)
+        os.close(self.fd)
+        if self.path.is_fifo():
+            self.path.unlink()
+        return b"".join(self.chunks) if self.opened else None
+
+
+# How often a running translator checks whether the run has been stopped
+CANCEL_POLL = 0.05
+
+
+def launch(
+    args: "list[str]",
+    cwd: Path,
+    timeout: float,
+    cancel: "threading.Event | None" = None,
+    output: "OutputPipe | None" = None,
+    limits: "dict[str, int] | None" = None,
+    cpus: "set[int] | None" = None,
+) -> Invocation:
+    # Setting cancel kills the translator; without wait4 it only takes effect
+    # once the translator exits or times out. output is read while the
+    # translator runs. On POSIX the translator gets a session of its own, so
+    # it and anything it starts can be killed together, with limits applied.
+    start_time = time.perf_counter()
+    limits = limits or {}
+    # Limits are applied from outside where possible, as preexec_fn is unsafe
+    # with threads. They take effect while the JVM is still starting up.
+    prlimit = RESOURCE_FOUND and hasattr(resource, "prlimit")
+    # A child inherits the affinity of the thread that starts it, so pinning
+    # this thread while it does pins every thread the JVM ever starts
+    previous = None
+    if cpus and hasattr(os, "sched_setaffinity"):
+        previous = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, cpus)
+    try:
+        with tracer.span("spawn", "launch"):
+            p = subprocess.Popen(
+                args=args,
+                cwd=cwd,
+                stderr=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                start_new_session=os.name == "posix",
+                preexec_fn=(
+                    (lambda: _set_limits(limits)) if limits and not prlimit else None
+                ),
+            )
+    finally:
+        if previous is not None:
+            os.sched_setaffinity(0, previous)
+    if limits and prlimit:
+        _set_limits(limits, p.pid)
+    run_start = tracer.now()
+    try:
+        if hasattr(os, "wait4"):
+            out, err, timed_out, cancelled = _drain(
+                p, start_time + timeout, cancel, output
+            )
+            # Leave nothing the translator started running. It is not reaped
+            # yet, so its process group ID cannot have been reused.
+            _kill(p)
+        else:
+            timed_out = cancelled = False
+            try:
+                out, err = p.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                _kill(p)
+                out, err = p.communicate()
+                timed_out = True
+        remaining = timeout - (time.perf_counter() - start_time)
+        cpu, rss, killed = _reap(p, max(remaining, 0))
+    except KeyboardInterrupt:
+        # In a session of its own the translator never sees the Ctrl-C
+        _kill(p)
+        raise
+    tracer.record("run", "launch", run_start, pid=p.pid, returncode=p.returncode)
+    invocation = Invocation(
+        args=args,
+        returncode=p.returncode,
+        out=out.decode(errors="replace"),
+        err=err.decode(errors="replace"),
+        wall=time.perf_counter() - start_time,
+        cpu=cpu,
+        rss=rss,
+        timed_out=timed_out or killed,
+        cancelled=cancelled,
+    )
+    if limits and not invocation.cancelled:
+        invocation.limit = _limit_exceeded(invocation, limits)
+    return invocation
+
+
+def _set_limits(limits: "dict[str, int]", pid: "int | None" = None) -> None:
+    for name, value in limits.items():
+        rlimit = getattr(resource, LIMITS[name][0])
+        # A hard CPU limit above the soft one lets SIGXCPU arrive before SIGKILL
+        hard = value + 1 if name == "cpu" else value
+        if pid is None:
+            resource.setrlimit(rlimit, (value, hard))
+        else:
+            resource.prlimit(pid, rlimit, (value, hard))
+
+
+def _limit_exceeded(invocation: Invocation, limits: "dict[str, int]") -> "str | None":
+    # The rlimit the translator ran into, judged by how it died
+    if invocation.returncode == 0 or invocation.returncode is None:
+        return None
+    for name in limits:
+        rlimit, signame, messages = LIMITS[name]
+        if signame is not None and invocation.returncode == -getattr(
+            signal, signame, 0
+        ):
+            return rlimit
+        if any(m in invocation.err or m in invocation.out for m in messages):
+            return rlimit
+    return None
+
+
+def _kill(p: subprocess.Popen) -> None:
+    # Kill the translator's whole process group where there is one
+    if os.name != "posix":
+        p.kill()
+        return
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _drain(
+    p: subprocess.Popen,
+    deadline: float,
+    cancel: "threading.Event | None" = None,
+    output: "OutputPipe | None" = None,
+) -> "tuple[bytes, bytes, bool, bool]":
+    # Like Popen.communicate(), but leaves the child unreaped for _reap
+    assert p.stdout is not None and p.stderr is not None
+    out_fd, err_fd = p.stdout.fileno(), p.stderr.fileno()
+    chunks: "dict[int, list[bytes]]" = {out_fd: [], err_fd: []}
+    timed_out = cancelled = False
+    with selectors.DefaultSelector() as selector:
+        selector.register(p.stdout, selectors.EVENT_READ)
+        selector.register(p.stderr, selectors.EVENT_READ)
+        if output is not None:
+            selector.register(output, selectors.EVENT_READ)
+        # Until the translator closes stdout and stderr, normally on exit
+        while p.stdout in selector.get_map() or p.stderr in selector.get_map():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 and not timed_out:
+                _kill(p)
+                timed_out = True
+            if cancel is not None and cancel.is_set() and not cancelled:
+                _kill(p)
+                cancelled = True
+            wait = max(remaining, 0) or None
+            if cancel is not None and not cancelled:
+                wait = min(wait or CANCEL_POLL, CANCEL_POLL)
+            for key, _ in selector.select(timeout=wait):
+                if key.fileobj is output:
+                    # Its descriptor changes when it is reopened
+                    selector.unregister(output)
+                    if output.read():
+                        selector.register(output, selectors.EVENT_READ)
+                    continue
+                data = os.read(key.fd, 65536)
+                if data:
+                    chunks[key.fd].append(data)
+                else:
+                    selector.unregister(key.fileobj)
+    p.stdout.close()
+    p.stderr.close()
+    return (
+        b"".join(chunks[out_fd]),
+        b"".join(chunks[err_fd]),
+        timed_out and not cancelled,
+        cancelled,
+    )
+
+
+def _reap(
+    p: subprocess.Popen, timeout: float
+) -> "tuple[float | None, int | None, bool]":
+    # Popen.wait() discards the child's resource usage, so reap it ourselves
+    # with wait4 where the platform has it
+    if not hasattr(os, "wait4"):
+        try:
+            p.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(p)
+            p.wait()
+            return None, None, True
+        return None, None, False
+    deadline = time.perf_counter() + timeout
+    flags = os.WNOHANG
+    killed = False
+    while True:
+        try:
+            pid, status, usage = os.wait4(p.pid, flags)
+        except ChildProcessError:
+            # Already reaped elsewhere, usage is lost
+            return None, None, killed
+        if pid:
+            p.returncode = os.waitstatus_to_exitcode(status)
+            break
+        if time.perf_counter() > deadline and not killed:
+            # Output pipes closed but the process lingers; treat as a timeout
+            _kill(p)
+            killed = True
+            flags = 0
+        else:
+            time.sleep(0.001)
+    rss = usage.ru_maxrss
+    if sys.platform == "darwin":
+        rss //= 1024  # reported in bytes rather than KiB
+    return usage.ru_utime + usage.ru_stime, rss, killed
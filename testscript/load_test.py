@@ -0,0 +1,148 @@
+import math
+import os
+import queue
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from args import LoadTestArgs
+from build import finish_build, start_build
+from common import Direction
+from launcher import Invocation
+from table_maker import TableMaker
+from test_prog import load_testcases, resolve_project
+from testcase import Testcase, make_lane
+
+
+class LevelResult:
+    def __init__(
+        self, concurrency: int, wall: float, latencies: "list[float]", errors: int
+    ):
+        self.concurrency = concurrency
+        self.wall = wall
+        self.latencies = sorted(latencies)
+        self.errors = errors
+
+    @property
+    def throughput(self) -> float:
+        # Cases per second, a case being one translation in each direction
+        return len(self.latencies) / 2 / self.wall if self.wall else 0.0
+
+    def percentile(self, q: float) -> float:
+        # Nearest-rank percentile
+        if not self.latencies:
+            return 0.0
+        rank = max(math.ceil(q / 100 * len(self.latencies)), 1)
+        return self.latencies[rank - 1]
+
+
+def concurrency_levels(maximum: int) -> "list[int]":
+    levels = []
+    level = 1
+    while level < maximum:
+        levels.append(level)
+        level *= 2
+    return levels + [maximum]
+
+
+def run_level(
+    work: "list[tuple[Testcase, Direction]]",
+    proj_dir: Path,
+    bin_dir: Path,
+    timeout: float,
+    concurrency: int,
+) -> LevelResult:
+    with tempfile.TemporaryDirectory(prefix="rw214-load-") as lanes_root:
+        lanes: "queue.Queue[Path]" = queue.Queue()
+        for n in range(concurrency):
+            lanes.put(make_lane(proj_dir, Path(lanes_root) / str(n)))
+
+        def invoke(item: "tuple[Testcase, Direction]") -> Invocation:
+            testcase, direction = item
+            lane = lanes.get()
+            try:
+                return testcase.execute(
+                    direction, proj_dir, bin_dir, timeout, work_dir=lane
+                )[0]
+            finally:
+                lanes.put(lane)
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            invocations = list(pool.map(invoke, work))
+        wall = time.perf_counter() - start_time
+    return LevelResult(
+        concurrency,
+        wall,
+        [i.wall for i in invocations if i.ok],
+        sum(not i.ok for i in invocations),
+    )
+
+
+def find_knee(results: "list[LevelResult]", min_gain: float) -> LevelResult:
+    # The last level whose throughput improved on the previous best by at
+    # least min_gain; beyond it more concurrency stops helping
+    knee = results[0]
+    for result in results[1:]:
+        if result.throughput >= knee.throughput * (1 + min_gain):
+            knee = result
+        else:
+            break
+    return knee
+
+
+def loadtest(args: LoadTestArgs):
+    proj_dir = resolve_project(args.proj, args.debug)
+    if proj_dir is None:
+        return
+    bin_dir = proj_dir / "bin"
+    build = start_build(proj_dir, args.debug)
+    testcases = load_testcases(args.debug)
+    if not finish_build(build, args.debug):
+        return
+    work = [
+        (testcase, direction)
+        for _ in range(args.rounds)
+        for testcase in testcases
+        for direction in (Direction.B2T, Direction.T2B)
+    ]
+    maximum = args.max_concurrency or 2 * (os.cpu_count() or 1)
+
+    results: "list[LevelResult]" = []
+    for concurrency in concurrency_levels(maximum):
+        print(
+            f"Running {len(work)} translations at concurrency {concurrency}...",
+            end=" ",
+            flush=True,
+        )
+        result = run_level(work, proj_dir, bin_dir, args.timeout, concurrency)
+        results.append(result)
+        print(f"{result.throughput:.2f} cases/s")
+
+    knee = find_knee(results, args.min_gain)
+    print(
+        TableMaker(
+            [["Concurrency", "Cases/s", "p50", "p90", "p99", "Max", "Errors"]]
+            + [
+                [
+                    f"{r.concurrency}{' *' if r is knee else ''}",
+                    f"{r.throughput:.2f}",
+                    f"{r.percentile(50) * 1000:.0f} ms",
+                    f"{r.percentile(90) * 1000:.0f} ms",
+                    f"{r.percentile(99) * 1000:.0f} ms",
+                    f"{r.percentile(100) * 1000:.0f} ms",
+                    r.errors,
+                ]
+                for r in results
+            ]
+        )
+    )
+    print(
+        f"Throughput saturates at concurrency {knee.concurrency} (*):"
+        f" {knee.throughput:.2f} cases/s, adding workers beyond it gains"
+        f" less than {args.min_gain * 100:.0f}%"
+    )
+
+    subprocess.run(["rm", "-rf", bin_dir], check=True)
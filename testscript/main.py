@@ -1,8 +1,27 @@
 import argparse
 
-from args import CreateArgs, TestArgs, ValidateArgs
+from args import (
+    BenchArgs,
+    BisectPerfArgs,
+    CompareArgs,
+    CoordinatorArgs,
+    CreateArgs,
+    HistoryArgs,
+    ImportArgs,
+    LoadTestArgs,
+    TestArgs,
+    ValidateArgs,
+    WorkerArgs,
+)
+from benchmark import bench
+from bisect_perf import bisect_perf
 from common import set_color_enabled
+from compare import compare
 from create_case import create
+from distributed import coordinator, worker
+from import_cases import import_cases
+from load_test import loadtest
+from show_history import history
 from table_maker import set_tabulate_enabled
 from test_prog import test
 from validate_cases import validate
@@ -21,6 +40,22 @@ def main(args: argparse.Namespace, parser: argparse.ArgumentParser):
         validate(ValidateArgs(args))
     elif args.action == "create":
         create(CreateArgs(args))
+    elif args.action == "import":
+        import_cases(ImportArgs(args))
+    elif args.action == "loadtest":
+        loadtest(LoadTestArgs(args))
+    elif args.action == "compare":
+        compare(CompareArgs(args))
+    elif args.action == "bench":
+        bench(BenchArgs(args))
+    elif args.action == "bisect-perf":
+        bisect_perf(BisectPerfArgs(args))
+    elif args.action == "history":
+        history(HistoryArgs(args))
+    elif args.action == "coordinator":
+        coordinator(CoordinatorArgs(args))
+    elif args.action == "worker":
+        worker(WorkerArgs(args))
     else:
         parser.print_help()
 
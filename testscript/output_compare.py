@@ -0,0 +1,122 @@
+import io
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+CHUNK_SIZE = 1 << 16
+
+# UTF-8 continuation bytes, which do not start a character
+CONTINUATION = bytes(range(0x80, 0xC0))
+
+
+class Difference:
+    # Where two outputs first differ: a byte offset into the output with its
+    # newlines normalised, and the 1-based line and column (in characters)
+    def __init__(self, offset: int, line: int, column: int):
+        self.offset = offset
+        self.line = line
+        self.column = column
+
+    def __str__(self) -> str:
+        return f"line {self.line}, column {self.column} (byte {self.offset})"
+
+    def to_list(self) -> "list[int]":
+        return [self.offset, self.line, self.column]
+
+
+class Output:
+    # A translator's output as it was written: a file, or the bytes captured
+    # through a pipe. It is compared in chunks, and only decoded if its text is
+    # needed.
+    def __init__(self, data: "bytes | None" = None, path: "Path | None" = None):
+        self.data = data
+        self.path = path
+
+    @staticmethod
+    def from_text(text: str) -> "Output":
+        return Output(data=text.encode("utf-8"))
+
+    def open(self) -> BinaryIO:
+        if self.path is not None:
+            return open(self.path, "rb")
+        return io.BytesIO(self.data or b"")
+
+    def text(self) -> str:
+        # Decoded exactly as reading the file in text mode would
+        with io.TextIOWrapper(self.open(), encoding="utf-8") as f:
+            return f.read()
+
+    def discard(self) -> None:
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+def normalised(f: BinaryIO) -> "Iterator[bytes]":
+    # Non-empty chunks of f with \r\n and \r turned into \n, as text mode reads
+    # them, so outputs compare equal exactly when their text does
+    carry = b""
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        chunk = carry + chunk
+        # A \r at the end may be the start of a \r\n split across chunks
+        carry = b"\r" if chunk.endswith(b"\r") else b""
+        chunk = chunk[: len(chunk) - len(carry)]
+        chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        if chunk:
+            yield chunk
+    if carry:
+        yield b"\n"
+
+
+def first_difference(a: BinaryIO, b: BinaryIO) -> "Difference | None":
+    # Compares two streams a chunk at a time, stopping at the first byte that
+    # differs. Returns None if they are the same.
+    chunks_a, chunks_b = normalised(a), normalised(b)
+    buf_a = buf_b = b""
+    offset, line, column = 0, 1, 1
+
+    def advance(data: bytes) -> None:
+        nonlocal offset, line, column
+        offset += len(data)
+        newlines = data.count(b"\n")
+        if newlines:
+            line += newlines
+            data = data[data.rfind(b"\n") + 1 :]
+            column = 1
+        column += len(data.translate(None, CONTINUATION))
+
+    while True:
+        buf_a = buf_a or next(chunks_a, b"")
+        buf_b = buf_b or next(chunks_b, b"")
+        if not buf_a and not buf_b:
+            return None
+        n = min(len(buf_a), len(buf_b))
+        if buf_a[:n] == buf_b[:n]:
+            if not n:
+                # One output is a prefix of the other
+                if (buf_a or buf_b)[0] in CONTINUATION:
+                    # The shorter ends inside a character advance counted
+                    column -= 1
+                return Difference(offset, line, column)
+            advance(buf_a[:n])
+            buf_a, buf_b = buf_a[n:], buf_b[n:]
+            continue
+        # Bisect for the first differing byte; buf_a[:low] matches throughout
+        low, high = 0, n
+        while high - low > 1:
+            mid = (low + high) // 2
+            if buf_a[low:mid] == buf_b[low:mid]:
+                low = mid
+            else:
+                high = mid
+        advance(buf_a[:low])
+        if buf_a[low] in CONTINUATION:
+            # Inside a character, which advance already counted
+            column -= 1
+        return Difference(offset, line, column)
+
+
+def compare_output(expected: Path, output: Output) -> "Difference | None":
+    with open(expected, "rb") as a, output.open() as b:
+        return first_difference(a, b)
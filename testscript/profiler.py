@@ -0,0 +1,166 @@
+import json
+import re
+import shutil
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from common import Direction
+from launcher import LaunchOptions
+from table_maker import TableMaker
+from testcase import TestSet
+
+EVENTS = "jdk.ExecutionSample,jdk.ObjectAllocationSample,jdk.GarbageCollection"
+
+
+class ProfileSummary:
+    def __init__(
+        self,
+        samples: int,
+        hot_methods: "list[tuple[str, float]]",
+        allocations: "list[tuple[str, int]]",
+        gc_count: int,
+        gc_pause_ms: float,
+    ):
+        self.samples = samples
+        self.hot_methods = hot_methods  # (method, share of samples)
+        self.allocations = allocations  # (class, sampled bytes)
+        self.gc_count = gc_count
+        self.gc_pause_ms = gc_pause_ms
+
+
+def find_jfr() -> "str | None":
+    # jfr ships next to java in the JDK's bin directory
+    jfr = shutil.which("jfr")
+    if jfr is None and (java := shutil.which("java")):
+        candidate = Path(java).resolve().parent / "jfr"
+        if candidate.exists():
+            jfr = str(candidate)
+    return jfr
+
+
+def parse_duration_ms(value: Any) -> float:
+    # jfr prints durations as ISO-8601 strings, e.g. "PT0.0012S"
+    if isinstance(value, (int, float)):
+        return value / 1e6
+    match = re.fullmatch(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?", str(value))
+    if not match:
+        return 0.0
+    hours, minutes, seconds = (float(x) if x else 0.0 for x in match.groups())
+    return (hours * 3600 + minutes * 60 + seconds) * 1000
+
+
+def frame_name(frame: "dict[str, Any]") -> str:
+    method = frame["method"]
+    return f"{method['type']['name'].replace('/', '.')}.{method['name']}"
+
+
+def summarize(recording: Path, jfr: str, top: int = 5) -> "ProfileSummary | None":
+    p = subprocess.run(
+        [jfr, "print", "--json", "--events", EVENTS, str(recording)],
+        capture_output=True,
+        text=True,
+    )
+    if p.returncode != 0:
+        return None
+    try:
+        events = json.loads(p.stdout)["recording"]["events"]
+    except (json.JSONDecodeError, KeyError):
+        return None
+    methods: "Counter[str]" = Counter()
+    allocations: "Counter[str]" = Counter()
+    gc_count = 0
+    gc_pause_ms = 0.0
+    for event in events:
+        values = event["values"]
+        if event["type"] == "jdk.ExecutionSample":
+            frames = (values.get("stackTrace") or {}).get("frames") or []
+            if frames:
+                methods[frame_name(frames[0])] += 1
+        elif event["type"] == "jdk.ObjectAllocationSample":
+            name = values["objectClass"]["name"].replace("/", ".")
+            allocations[name] += int(values.get("weight", 0))
+        elif event["type"] == "jdk.GarbageCollection":
+            gc_count += 1
+            gc_pause_ms += parse_duration_ms(values.get("sumOfPauses", 0))
+    samples = sum(methods.values())
+    return ProfileSummary(
+        samples=samples,
+        hot_methods=[(name, n / samples) for name, n in methods.most_common(top)],
+        allocations=allocations.most_common(top),
+        gc_count=gc_count,
+        gc_pause_ms=gc_pause_ms,
+    )
+
+
+def profile_testset(
+    testset: TestSet, options: LaunchOptions, jobs: int = 1
+) -> "dict[tuple[str, Direction], ProfileSummary]":
+    jfr = find_jfr()
+    if jfr is None:
+        print("Could not find the JDK 'jfr' tool, recordings were not summarised.")
+        print("Recordings are in", options.profile_dir)
+        return {}
+    # Only recordings of invocations launched in this run, so files left in the
+    # profile directory by earlier runs are never mistaken for them.
+    # Deduplicated cases share the recording of the case that was launched.
+    recordings = {
+        (leader, direction): options.recording(leader, direction)
+        for (_, direction), leader in testset.launched.items()
+    }
+    recordings = {k: v for k, v in recordings.items() if v.exists()}
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        summaries = dict(
+            zip(
+                recordings.keys(),
+                pool.map(lambda path: summarize(path, jfr), recordings.values()),
+            )
+        )
+    return {
+        (case, direction): summaries[(leader, direction)]
+        for (case, direction), leader in testset.launched.items()
+        if summaries.get((leader, direction)) is not None
+    }
+
+
+def format_profiles(
+    testset: TestSet, profiles: "dict[tuple[str, Direction], ProfileSummary]"
+) -> str:
+    ret = ""
+    for testcase in testset:
+        for direction in (Direction.B2T, Direction.T2B):
+            summary = profiles.get((testcase.root.name, direction))
+            if summary is None:
+                continue
+            ret += f"\nProfile: {testcase.name} ({direction.name})\n"
+            leader = testset.launched[(testcase.root.name, direction)]
+            if leader != testcase.root.name:
+                ret += f"Same input as {leader}, sharing its recording\n"
+            ret += TableMaker(
+                [
+                    ["Samples", summary.samples],
+                    [
+                        "Hot methods",
+                        "\n".join(
+                            f"{share * 100:5.1f}% {name}"
+                            for name, share in summary.hot_methods
+                        )
+                        or "No samples",
+                    ],
+                    [
+                        "Allocations",
+                        "\n".join(
+                            f"{size / 1024:8.0f} KiB {name}"
+                            for name, size in summary.allocations
+                        )
+                        or "No samples",
+                    ],
+                    [
+                        "GC",
+                        f"{summary.gc_count} collections, {summary.gc_pause_ms:.1f} ms paused",
+                    ],
+                ]
+            )
+    return ret
@@ -0,0 +1,129 @@
+import shutil
+import sys
+import threading
+import time
+
+from common import Status
+
+# Fastest the live view is redrawn, and how often a summary line is printed
+# when the output is not a terminal
+REFRESH_INTERVAL = 0.2
+SUMMARY_INTERVAL = 10.0
+
+# Number of running invocations shown, longest running first
+SLOWEST_SHOWN = 3
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02}m"
+    if minutes:
+        return f"{minutes}m{seconds:02}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    # Progress of a run: a view redrawn in place on a terminal, or a summary
+    # line now and then otherwise. Drawing happens on a thread of its own at a
+    # capped rate, so finishing thousands of testcases costs only counting.
+    def __init__(self, total: int, live: "bool | None" = None) -> None:
+        self.total = total
+        self.live = sys.stdout.isatty() if live is None else live
+        self.counts: "dict[Status, int]" = {}
+        self.finished = 0
+        self.running: "dict[int, tuple[str, float]]" = {}  # token -> label, start
+        self.tokens = 0
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.drawn = 0  # lines of the live view on screen
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._refresh, daemon=True)
+        self.thread.start()
+
+    def launch(self, label: str) -> int:
+        # Mark an invocation as running, returning a token for land
+        with self.lock:
+            self.tokens += 1
+            self.running[self.tokens] = (label, time.perf_counter())
+            return self.tokens
+
+    def land(self, token: int) -> None:
+        with self.lock:
+            self.running.pop(token, None)
+
+    def done(self, status: Status, line: "str | None" = None) -> None:
+        # Count a finished testcase, logging line if given
+        with self.lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.finished += 1
+        if line is not None:
+            self.log(line)
+
+    def log(self, line: str) -> None:
+        # Print a line where the live view was; it is redrawn below on the
+        # next refresh
+        with self.lock:
+            self._clear()
+            print(line)
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+        with self.lock:
+            self._clear()
+
+    def _refresh(self) -> None:
+        interval = REFRESH_INTERVAL if self.live else SUMMARY_INTERVAL
+        while not self.stopped.wait(interval):
+            with self.lock:
+                if self.live:
+                    self._clear()
+                    self._draw()
+                else:
+                    print(" | ".join(self._lines()[:2]), flush=True)
+
+    def _lines(self) -> "list[str]":
+        elapsed = time.perf_counter() - self.start
+        rate = self.finished / elapsed if elapsed else 0.0
+        eta = (
+            format_duration((self.total - self.finished) / rate) if rate else "unknown"
+        )
+        percent = self.finished / self.total if self.total else 1.0
+        lines = [
+            f"{self.finished}/{self.total} testcases ({percent:.0%})"
+            f" | {rate:.1f}/s | elapsed {format_duration(elapsed)} | ETA {eta}"
+            f" | {len(self.running)} running"
+        ]
+        lines.append(
+            " | ".join(
+                f"{status.name} {count}"
+                for status, count in sorted(
+                    self.counts.items(), key=lambda item: item[0].value
+                )
+            )
+            or "none finished yet"
+        )
+        if self.live:
+            now = time.perf_counter()
+            slowest = sorted(self.running.values(), key=lambda item: item[1])
+            lines += [
+                f"  running {now - start:6.1f}s  {label}"
+                for label, start in slowest[:SLOWEST_SHOWN]
+            ]
+        return lines
+
+    def _draw(self) -> None:
+        # Lines are cut to the terminal's width, so none wraps and the view can
+        # be erased by moving up exactly as many lines as were drawn
+        width = shutil.get_terminal_size().columns
+        lines = [line[: width - 1] for line in self._lines()]
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        self.drawn = len(lines)
+
+    def _clear(self) -> None:
+        if self.drawn:
+            sys.stdout.write(f"\x1b[{self.drawn}F\x1b[J")
+            self.drawn = 0
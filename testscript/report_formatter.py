@@ -1,7 +1,7 @@
 import json
-import os
 import re
-from typing import Any
+import shutil
+from typing import Any, Iterator
 
 from common import Direction, Status, colorize, ex_v_fd
 from table_maker import TableMaker
@@ -27,7 +27,17 @@ class TableFormatter(OutputFormatter):
         details: bool,
         error_output: bool = False,
     ) -> str:
-        MAX_LEN = max(os.get_terminal_size().columns - 20, 80)
+        return "".join(self.iter_format(testset, show_passing, details, error_output))
+
+    def iter_format(
+        self,
+        testset: TestSet,
+        show_passing: bool,
+        details: bool,
+        error_output: bool = False,
+    ) -> "Iterator[str]":
+        # Yields the report a piece at a time, so it can be printed as it is made
+        MAX_LEN = max(shutil.get_terminal_size().columns - 20, 80)
 
         def ellipsis_string(S, max_len=MAX_LEN):
             if len(S) > max_len:
@@ -73,6 +83,9 @@ class TableFormatter(OutputFormatter):
                         + colorize(ellipsis_string(afr_fd), "green"),
                     ],
                 ]
+                difference = testcase.result.differences.get(Direction.B2T)
+                if difference is not None:
+                    table_b2t.append(["First difference", str(difference)])
                 table_t2b = [
                     ["Direction", "T2B"],
                     [
@@ -104,25 +117,29 @@ class TableFormatter(OutputFormatter):
                         + colorize(ellipsis_string(brf_fd), "green"),
                     ],
                 ]
+                difference = testcase.result.differences.get(Direction.T2B)
+                if difference is not None:
+                    table_t2b.append(["First difference", str(difference)])
                 return [table_b2t, table_t2b]
             else:
                 return [[], []]
 
-        ret = ""
-        for testcase in testset:
+        for testcase in testset.replay():
             if not (testcase.status != Status.PASSED or show_passing):
                 continue
-            ret += "\n"
-            ret += f"Name: {testcase.name}\n"
+            if testcase.status == Status.SKIPPED:
+                continue
+            yield "\n"
+            yield f"Name: {testcase.name}\n"
             if details:
-                ret += f"Description: {testcase.description}\n"
-                ret += f"Level: {testcase.level}\n"
-                ret += f"Status: {testcase.status.name}\n"
+                yield f"Description: {testcase.description}\n"
+                yield f"Level: {testcase.level}\n"
+                yield f"Status: {testcase.status.name}\n"
                 b2t, t2b = get_table(testcase)
                 if not testcase.passed(Direction.B2T) or show_passing:
-                    ret += TableMaker(b2t)
+                    yield from TableMaker.stream(b2t)
                 if not testcase.passed(Direction.T2B) or show_passing:
-                    ret += TableMaker(t2b)
+                    yield from TableMaker.stream(t2b)
             elif testcase.result:
                 afr_ex, afr_fd = ex_v_fd(
                     testcase.result.expected_afr, testcase.result.recieved_afr
@@ -130,15 +147,25 @@ class TableFormatter(OutputFormatter):
                 brf_ex, brf_fd = ex_v_fd(
                     testcase.result.expected_brf, testcase.result.recieved_brf
                 )
-                ret += f"Status: {testcase.status.name}\n"
+                yield f"Status: {testcase.status.name}\n"
                 if not testcase.passed(Direction.B2T) or show_passing:
-                    ret += "Expected: " + afr_ex + "\n"
-                    ret += "Recieved: " + afr_fd + "\n"
+                    yield "Expected: " + afr_ex + "\n"
+                    yield "Recieved: " + afr_fd + "\n"
                 if not testcase.passed(Direction.T2B) or show_passing:
-                    ret += "Expected: " + brf_ex + "\n"
-                    ret += "Recieved: " + brf_fd + "\n"
+                    yield "Expected: " + brf_ex + "\n"
+                    yield "Recieved: " + brf_fd + "\n"
+                for direction, difference in testcase.result.differences.items():
+                    if difference is not None:
+                        yield f"First difference ({direction.name}): {difference}\n"
+            for direction in (Direction.B2T, Direction.T2B):
+                invocation = testcase.invocations.get(direction)
+                if invocation is not None and invocation.limit is not None:
+                    yield f"Limit exceeded ({direction.name}): {invocation.limit}\n"
+                breaches = testcase.budget_breaches(direction)
+                if breaches:
+                    yield f"Over budget ({direction.name}): {', '.join(breaches)}\n"
             if (testcase.status != Status.PASSED or show_passing) and error_output:
-                ret += (
+                yield (
                     f"Error: "
                     + "\n\t\t".join(
                         list(filter(lambda x: bool(x), testcase.err.split("\n")))
@@ -146,4 +173,3 @@ class TableFormatter(OutputFormatter):
                     )
                     + "\n"
                 )
-        return ret
@@ -0,0 +1,33 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from common import STATE_DIR
+
+
+class ResultLog:
+    # Append-only log of the bulky part of finished testcases (their outputs),
+    # one JSON record per line. Only each record's offset is kept in memory.
+    # Each run has a log of its own, removed when the run is done with it.
+    def __init__(self, path: "Path | None" = None) -> None:
+        self.path = path or STATE_DIR / f"results-{os.getpid()}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "w+b")
+        self.offsets: "dict[str, int]" = {}
+
+    def __contains__(self, case: str) -> bool:
+        return case in self.offsets
+
+    def append(self, case: str, record: "dict[str, Any]") -> None:
+        self.offsets[case] = self.file.seek(0, 2)
+        self.file.write(json.dumps(record).encode() + b"\n")
+
+    def read(self, case: str) -> "dict[str, Any]":
+        self.file.flush()
+        self.file.seek(self.offsets[case])
+        return json.loads(self.file.readline())
+
+    def close(self) -> None:
+        self.file.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,206 @@
+import datetime
+import hashlib
+import sqlite3
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any
+
+from common import STATE_DIR, Status
+from testcase import TestSet
+
+HISTORY_DB = STATE_DIR / "history.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    project TEXT NOT NULL,
+    build_hash TEXT NOT NULL,
+    commit_id TEXT,
+    passed INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    errored INTEGER NOT NULL,
+    over_budget INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL,
+    time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    case_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    level TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    status TEXT NOT NULL,
+    wall REAL,
+    cpu REAL,
+    rss INTEGER,
+    PRIMARY KEY (run_id, case_id, direction)
+);
+CREATE INDEX IF NOT EXISTS results_by_case ON results (case_id, direction, run_id);
+"""
+
+
+def build_hash(src_dir: Path) -> str:
+    # Hash of the translator sources, so runs of the same code can be grouped
+    digest = hashlib.sha256()
+    for path in sorted(src_dir.rglob("*.java")):
+        digest.update(path.relative_to(src_dir).as_posix().encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def project_commit(proj_dir: Path) -> "str | None":
+    try:
+        p = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=proj_dir,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return p.stdout.strip() if p.returncode == 0 else None
+
+
+class RunHistory:
+    def __init__(self, path: Path = HISTORY_DB) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def record(
+        self, testset: TestSet, summary: "dict[str, Any]", proj_dir: Path
+    ) -> int:
+        summary = {k.strip(): v for k, v in summary.items()}
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (started, project, build_hash, commit_id, passed,"
+                " failed, errored, over_budget, total, time)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                    str(proj_dir),
+                    build_hash(proj_dir / "src"),
+                    project_commit(proj_dir),
+                    summary["Passed"],
+                    summary["Failed"],
+                    summary["Error"],
+                    summary["Over budget"],
+                    summary["Total"],
+                    summary["Time"],
+                ),
+            )
+            run_id = cur.lastrowid
+            assert run_id is not None
+            rows = []
+            # Only the timings are kept, so the outputs are never read back
+            for testcase in testset:
+                for direction, invocation in testcase.invocations.items():
+                    rows.append(
+                        (
+                            run_id,
+                            testcase.root.name,
+                            testcase.name,
+                            testcase.level,
+                            direction.to_abv(),
+                            testcase.statuses.get(direction, Status.READY).name,
+                            invocation.wall,
+                            invocation.cpu,
+                            invocation.rss,
+                        )
+                    )
+            self.conn.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return run_id
+
+    def runs(self, limit: int) -> "list[sqlite3.Row]":
+        return list(
+            reversed(
+                self.conn.execute(
+                    "SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,)
+                ).fetchall()
+            )
+        )
+
+    def series(
+        self, limit: int, case_id: "str | None" = None
+    ) -> "dict[tuple[str, str], list[sqlite3.Row]]":
+        # Per (case, direction) results over the last `limit` runs, oldest first
+        query = (
+            "SELECT results.*, runs.commit_id, runs.build_hash FROM results"
+            " JOIN runs ON runs.id = results.run_id"
+            " WHERE run_id IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)"
+        )
+        params: "list[Any]" = [limit]
+        if case_id is not None:
+            query += " AND case_id = ?"
+            params.append(case_id)
+        query += " ORDER BY case_id, direction, run_id"
+        ret: "dict[tuple[str, str], list[sqlite3.Row]]" = {}
+        for row in self.conn.execute(query, params):
+            ret.setdefault((row["case_id"], row["direction"]), []).append(row)
+        return ret
+
+
+def slowest(
+    series: "dict[tuple[str, str], list[sqlite3.Row]]", count: int
+) -> "list[tuple[str, str, float, float]]":
+    # (case, direction, median wall time, latest wall time), slowest median first
+    ret = []
+    for (case_id, direction), rows in series.items():
+        times = [row["wall"] for row in rows if row["wall"] is not None]
+        if times:
+            ret.append((case_id, direction, statistics.median(times), times[-1]))
+    ret.sort(key=lambda x: -x[2])
+    return ret[:count]
+
+
+def first_failure(rows: "list[sqlite3.Row]") -> "sqlite3.Row | None":
+    # First run of the current streak of non-passing results, if the case
+    # passed at some point before it
+    if not rows or rows[-1]["status"] == Status.PASSED.name:
+        return None
+    i = len(rows) - 1
+    while i > 0 and rows[i - 1]["status"] != Status.PASSED.name:
+        i -= 1
+    return rows[i] if i > 0 else None
+
+
+def first_slowdown(
+    rows: "list[sqlite3.Row]", threshold: float, window: int = 5
+) -> "tuple[sqlite3.Row, float, float] | None":
+    # Earliest run from which wall time stayed more than `threshold` (a fraction)
+    # above the median of the `window` runs before it, through to the latest run.
+    # Returns that run with the median times before and after it, the one before
+    # never zero.
+    times = [row["wall"] for row in rows]
+    if any(t is None for t in times):
+        return None
+    for start in range(1, len(times)):
+        before = statistics.median(times[max(0, start - window) : start])
+        if not before:
+            # No slowdown can be measured relative to zero
+            continue
+        if all(t > before * (1 + threshold) for t in times[start:]):
+            return rows[start], before, statistics.median(times[start:])
+    return None
+
+
+def sparkline(values: "list[float]") -> str:
+    bars = " ▁▂▃▄▅▆▇█"
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    if high == low:
+        return bars[4] * len(values)
+    return "".join(
+        bars[1 + round((v - low) / (high - low) * (len(bars) - 2))] for v in values
+    )
@@ -0,0 +1,130 @@
+import heapq
+import json
+from pathlib import Path
+from typing import Iterable
+
+from common import STATE_DIR, Status
+from testcase import Testcase
+
+DURATIONS_FILE = STATE_DIR / "durations.json"
+
+
+class DurationHistory:
+    # Last known duration and status of every testcase, keyed by folder name
+    def __init__(self, path: Path = DURATIONS_FILE) -> None:
+        self.path = path
+        self.entries: "dict[str, dict[str, float | str]]" = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            print(f"Ignoring unreadable duration history at {self.path}")
+            return
+        if isinstance(data, dict):
+            self.entries = data
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+
+    def duration(self, testcase: Testcase) -> "float | None":
+        entry = self.entries.get(testcase.root.name)
+        if entry is None:
+            return None
+        return float(entry["time"])
+
+    def failed(self, testcase: Testcase) -> bool:
+        entry = self.entries.get(testcase.root.name)
+        return entry is not None and entry["status"] != Status.PASSED.name
+
+    def record(self, testcases: "Iterable[Testcase]") -> None:
+        for testcase in testcases:
+            if testcase.status in (Status.READY, Status.RUNNING, Status.SKIPPED):
+                continue
+            self.entries[testcase.root.name] = {
+                "time": testcase.time,
+                "status": testcase.status.name,
+            }
+
+
+def estimate(testcases: "list[Testcase]", history: DurationHistory) -> "list[float]":
+    # Cases without history are assumed to take as long as an average known case
+    known = [d for d in map(history.duration, testcases) if d is not None]
+    default = sum(known) / len(known) if known else 0.0
+    return [d if d is not None else default for d in map(history.duration, testcases)]
+
+
+def schedule(
+    testcases: "list[Testcase]", history: DurationHistory, failed_first: bool = False
+) -> "list[Testcase]":
+    # Longest-processing-time first: a pool that pulls jobs in this order is the
+    # classic LPT list schedule, within 4/3 of the optimal makespan.
+    # Previously failing cases optionally jump the queue for earlier feedback.
+    durations = estimate(testcases, history)
+    order = sorted(
+        range(len(testcases)),
+        key=lambda i: (
+            not (failed_first and history.failed(testcases[i])),
+            -durations[i],
+            testcases[i].root.name,
+        ),
+    )
+    return [testcases[i] for i in order]
+
+
+def prioritise(
+    testcases: "list[Testcase]", history: DurationHistory
+) -> "list[Testcase]":
+    # For runs that may be cut short, most informative first: cases that failed
+    # last time, then the quickest case of each level and tag not yet covered,
+    # then everything else quickest first, to fit the most verdicts in
+    durations = estimate(testcases, history)
+    by_time = [
+        testcases[i]
+        for i in sorted(
+            range(len(testcases)),
+            key=lambda i: (durations[i], testcases[i].root.name),
+        )
+    ]
+    first = [testcase for testcase in by_time if history.failed(testcase)]
+    chosen = {id(testcase) for testcase in first}
+    covered: "set[str]" = set()
+    for testcase in first:
+        covered.update(coverage(testcase))
+    for testcase in by_time:
+        if id(testcase) not in chosen and not coverage(testcase) <= covered:
+            first.append(testcase)
+            chosen.add(id(testcase))
+            covered.update(coverage(testcase))
+    return first + [testcase for testcase in by_time if id(testcase) not in chosen]
+
+
+def coverage(testcase: Testcase) -> "set[str]":
+    return {f"level:{testcase.level}"} | {f"tag:{tag}" for tag in testcase.tags}
+
+
+def makespan(durations: "list[float]", workers: int) -> float:
+    # Simulate dispatching jobs in order to whichever worker frees up first
+    lanes = [0.0] * max(workers, 1)
+    for duration in durations:
+        heapq.heappush(lanes, heapq.heappop(lanes) + duration)
+    return max(lanes)
+
+
+def ideal_makespan(durations: "list[float]", workers: int) -> float:
+    if not durations:
+        return 0.0
+    return max(sum(durations) / max(workers, 1), max(durations))
+
+
+def forecast(
+    testcases: "list[Testcase]", history: DurationHistory, workers: int
+) -> "tuple[float, float]":
+    durations = estimate(testcases, history)
+    return makespan(durations, workers), ideal_makespan(durations, workers)
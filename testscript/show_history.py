@@ -0,0 +1,120 @@
+import sys
+
+import run_history
+from args import HistoryArgs
+from table_maker import TableMaker
+
+
+def describe_run(row) -> str:
+    return f"run {row['run_id']} ({row['commit_id'] or row['build_hash']})"
+
+
+def history(args: HistoryArgs):
+    if not run_history.HISTORY_DB.exists():
+        print("No run history found. Run the 'test' action first.")
+        sys.exit(1)
+    store = run_history.RunHistory()
+    runs = store.runs(args.runs)
+    series = store.series(args.runs, args.case)
+    store.close()
+    if not runs:
+        print("No runs recorded yet.")
+        return
+    if args.case and not series:
+        print(f"No results recorded for testcase '{args.case}'")
+        sys.exit(1)
+
+    print(f"Last {len(runs)} runs")
+    print(
+        TableMaker(
+            [
+                [
+                    "Run",
+                    "Date",
+                    "Build",
+                    "Commit",
+                    "Passed",
+                    "Failed",
+                    "Error",
+                    "Budget",
+                    "Time",
+                ]
+            ]
+            + [
+                [
+                    run["id"],
+                    run["started"],
+                    run["build_hash"],
+                    run["commit_id"] or "-",
+                    run["passed"],
+                    run["failed"],
+                    run["errored"],
+                    run["over_budget"],
+                    f"{run['time']:.2f}s",
+                ]
+                for run in runs
+            ]
+        )
+    )
+
+    top = run_history.slowest(series, args.slowest if not args.case else len(series))
+    print("Slowest testcases (median over recorded runs)")
+    print(
+        TableMaker(
+            [["Testcase", "Direction", "Median", "Latest", "Trend"]]
+            + [
+                [
+                    case_id,
+                    direction,
+                    f"{median:.3f}s",
+                    f"{latest:.3f}s",
+                    run_history.sparkline(
+                        [
+                            row["wall"]
+                            for row in series[(case_id, direction)]
+                            if row["wall"] is not None
+                        ]
+                    ),
+                ]
+                for case_id, direction, median, latest in top
+            ]
+        )
+    )
+
+    regressions = []
+    for (case_id, direction), rows in series.items():
+        failure = run_history.first_failure(rows)
+        if failure is not None:
+            regressions.append(
+                [
+                    case_id,
+                    direction,
+                    f"{failure['status']}",
+                    describe_run(failure),
+                    "PASSED",
+                    rows[-1]["status"],
+                ]
+            )
+        slowdown = run_history.first_slowdown(rows, args.threshold)
+        if slowdown is not None:
+            row, before, after = slowdown
+            regressions.append(
+                [
+                    case_id,
+                    direction,
+                    f"SLOWER (+{(after / before - 1) * 100:.0f}%)",
+                    describe_run(row),
+                    f"{before:.3f}s",
+                    f"{after:.3f}s",
+                ]
+            )
+    if regressions:
+        print("Regressions")
+        print(
+            TableMaker(
+                [["Testcase", "Direction", "Change", "Since", "Before", "Now"]]
+                + regressions
+            )
+        )
+    else:
+        print("No regressions found")
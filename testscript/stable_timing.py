@@ -0,0 +1,160 @@
+import copy
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+from common import Direction
+from launcher import Invocation, LaunchOptions, launch
+from table_maker import TableMaker
+from testcase import TestSet, make_lane
+
+# Coefficient of variation above which timings are too noisy to trust
+NOISE_CV = 0.05
+
+CALIBRATION_ROUNDS = 10
+
+# A fixed amount of CPU work, launched like a translator, so its spread is the
+# noise the host adds to every measurement
+CALIBRATION = "sum(i * i for i in range(300000))"
+
+
+def reserve_core() -> "tuple[int | None, set[int] | None]":
+    # Take a core for the translator away from this thread, so the script never
+    # competes with it. Returns the core and this thread's previous affinity.
+    if not hasattr(os, "sched_setaffinity"):
+        return None, None
+    cores = sorted(os.sched_getaffinity(0))
+    if len(cores) < 2:
+        return cores[0], None
+    previous = set(cores)
+    os.sched_setaffinity(0, previous - {cores[-1]})
+    return cores[-1], previous
+
+
+def trim(values: "list[float]") -> "list[float]":
+    # Drop outliers beyond Tukey's fences, 1.5 interquartile ranges out
+    if len(values) < 4:
+        return values
+    q1, _, q3 = statistics.quantiles(values, n=4)
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    return [value for value in values if low <= value <= high]
+
+
+def variation(values: "list[float]") -> "float | None":
+    if len(values) < 2 or not statistics.mean(values):
+        return None
+    return statistics.stdev(values) / statistics.mean(values)
+
+
+def calibrate(lane: Path, cpus: "set[int] | None", timeout: float) -> "float | None":
+    times = []
+    for _ in range(CALIBRATION_ROUNDS):
+        invocation = launch(
+            [sys.executable, "-c", CALIBRATION], cwd=lane, timeout=timeout, cpus=cpus
+        )
+        if invocation.ok:
+            times.append(invocation.wall)
+    return variation(trim(times))
+
+
+def stable_timing(
+    testset: TestSet,
+    proj_dir: Path,
+    bin_dir: Path,
+    timeout: float,
+    rounds: int,
+    options: "LaunchOptions | None" = None,
+) -> str:
+    # Time every translator run that succeeded again, rounds times on a core of
+    # its own, and replace its wall time with the median of the runs that are
+    # not outliers. Returns the report.
+    core, previous = reserve_core()
+    pinned = copy.copy(options or LaunchOptions())
+    pinned.cpus = {core} if core is not None else None
+    pinned.profile_dir = None
+    if core is None:
+        print("CPU pinning is not supported on this platform, timing unpinned")
+    elif previous is None:
+        print("Only one core available, the translator shares it with this script")
+    else:
+        print(f"Pinning the translator to core {core}")
+
+    # Testcases with the same input share one invocation
+    invocations: "dict[str, tuple[Invocation, str, Direction]]" = {}
+    for testcase in testset:
+        for direction, invocation in testcase.invocations.items():
+            if invocation.ok:
+                invocations.setdefault(
+                    testcase.invocation_key(direction),
+                    (invocation, testcase.root.name, direction),
+                )
+
+    rows: "list[list[str]]" = [
+        ["Testcase", "Direction", "Runs", "Discarded", "Median", "CV", ""]
+    ]
+    noisy = 0
+    try:
+        with tempfile.TemporaryDirectory(prefix="rw214-stable-") as tmp:
+            lane = make_lane(proj_dir, Path(tmp) / "lane")
+            print("Calibrating...")
+            noise = calibrate(lane, pinned.cpus, timeout)
+            print(f"Timing {len(invocations)} translator runs {rounds} times each...")
+            cases = {testcase.root.name: testcase for testcase in testset}
+            for invocation, case, direction in invocations.values():
+                times = []
+                for _ in range(rounds):
+                    run, output, error = cases[case].execute(
+                        direction,
+                        proj_dir,
+                        bin_dir,
+                        timeout,
+                        work_dir=lane,
+                        options=pinned,
+                    )
+                    if output is not None:
+                        output.discard()
+                    if run.ok and error is None:
+                        times.append(run.wall)
+                kept = trim(times)
+                if not kept:
+                    rows.append([case, direction.name, "0", "-", "-", "-", "failed"])
+                    continue
+                invocation.wall = statistics.median(kept)
+                cv = variation(kept)
+                noisy += cv is not None and cv > NOISE_CV
+                rows.append(
+                    [
+                        case,
+                        direction.name,
+                        str(len(times)),
+                        str(len(times) - len(kept)),
+                        f"{invocation.wall * 1000:.0f} ms",
+                        f"{cv:.1%}" if cv is not None else "-",
+                        "noisy" if cv is not None and cv > NOISE_CV else "",
+                    ]
+                )
+    finally:
+        if previous is not None:
+            os.sched_setaffinity(0, previous)
+    for testcase in testset:
+        if testcase.statuses:
+            testcase.apply_budgets()
+
+    ret = TableMaker(rows)
+    if noise is None:
+        ret += "\nCould not measure host noise, the calibration runs failed"
+    else:
+        ret += f"\nHost noise: {noise:.1%} CV on a fixed workload"
+        if noise > NOISE_CV:
+            ret += (
+                f"\nWARNING: the host is too noisy for reliable timings"
+                f" (above {NOISE_CV:.0%}), close other programs and try again"
+            )
+    if noisy:
+        ret += (
+            f"\nWARNING: {noisy} translator run(s) varied by more than"
+            f" {NOISE_CV:.0%}, their timings are not reliable"
+        )
+    return ret
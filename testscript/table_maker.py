@@ -1,4 +1,6 @@
-from typing import Any, Callable, Final
+from typing import Any, Final, Iterator
+
+from common import ANSI_ESCAPE, ColoredString
 
 TABULATE_ENABLED: Final[bool] = False
 TABULATE_FOUND: Final[bool] = False
@@ -20,15 +22,49 @@ except ImportError:
     print("Tabulate not found, using custom tabulate instead.")
 
 
+def display_width(text: str) -> int:
+    # ColoredString caches its own width; other strings are only scanned for
+    # colour codes if they contain any
+    if isinstance(text, ColoredString) or "\x1b" not in text:
+        return len(text)
+    return len(ANSI_ESCAPE.sub("", text))
+
+
+def layout(tabular_data: "list[list[Any]]") -> "list[list[list[tuple[str, int]]]]":
+    # Every cell as its lines paired with their display width, measured once
+    return [
+        [
+            (
+                [(text, display_width(text))]
+                if "\n" not in text
+                else [(line, display_width(line)) for line in text.split("\n")]
+            )
+            for text in (cell if isinstance(cell, str) else str(cell) for cell in row)
+        ]
+        for row in tabular_data
+    ]
+
+
+def iter_tabulate(tabular_data: "list[list[Any]]") -> "Iterator[str]":
+    rows = layout(tabular_data)
+    col_widths = [max(width for cell in col for _, width in cell) for col in zip(*rows)]
+    for row in rows:
+        if all(len(cell) == 1 for cell in row):
+            yield " | ".join(
+                line + " " * (col_widths[i] - width)
+                for i, ((line, width),) in enumerate(row)
+            ) + "\n"
+            continue
+        for n in range(max(len(cell) for cell in row)):
+            parts = []
+            for i, cell in enumerate(row):
+                line, width = cell[n] if n < len(cell) else ("", 0)
+                parts.append(line + " " * (col_widths[i] - width))
+            yield " | ".join(parts) + "\n"
+
+
 def custom_tabulate(tabular_data: "list[list[Any]]"):
-    col_widths = [max(len(str(cell)) for cell in col) for col in zip(*tabular_data)]
-    return (
-        "\n".join(
-            " | ".join(f"{str(cell):<{col_widths[i]}}" for i, cell in enumerate(row))
-            for row in tabular_data
-        )
-        + "\n"
-    )
+    return "".join(iter_tabulate(tabular_data))
 
 
 def set_tabulate_enabled(enabled: bool) -> None:
@@ -48,5 +84,12 @@ class _TableMaker:
             return _tabulate(tabular_data)
         return custom_tabulate(tabular_data)
 
+    def stream(self, tabular_data: "list[list[Any]]") -> "Iterator[str]":
+        # Yields the table a line at a time where possible
+        if TABULATE_ENABLED and TABULATE_FOUND:
+            yield _tabulate(tabular_data)
+        else:
+            yield from iter_tabulate(tabular_data)
+
 
-TableMaker: Callable[["list[list[Any]]"], str] = _TableMaker()
+TableMaker: _TableMaker = _TableMaker()
@@ -2,31 +2,41 @@ import subprocess
 import sys
 from pathlib import Path
 
+import tracer
 from args import TestArgs
+from build import finish_build, start_build
+from cds import archive_options, build_archive, compare_startup, remove_archive
+from checkpoint import Checkpoint
+from launcher import LaunchOptions
+from profiler import format_profiles, profile_testset
 from report_formatter import TableFormatter
+from result_log import ResultLog
+from run_history import HISTORY_DB, RunHistory, build_hash
+from scheduler import DurationHistory, forecast, prioritise, schedule
+from stable_timing import stable_timing
 from table_maker import TableMaker
 from testcase import Testcase, TestSet
 from testerror import TestError
 
 
-def test(args: TestArgs):
+def resolve_project(proj: Path, debug: bool = False) -> "Path | None":
     try:
-        if args.debug:
+        if debug:
             print("Resolving project directory")
-        proj_dir = Path(args.proj).resolve(strict=True)
-        if args.debug:
+        proj_dir = Path(proj).resolve(strict=True)
+        if debug:
             print("Resolved project directory")
     except FileNotFoundError:
-        if args.debug:
+        if debug:
             print("Project directory resolution failed, using provided path")
-        proj_dir = Path(args.proj)
+        proj_dir = Path(proj)
     src_dir = proj_dir / "src"
     bin_dir = proj_dir / "bin"
 
     if not proj_dir.exists():
         print("The provided path does not exist.")
         print("Provided path:", proj_dir)
-        return
+        return None
 
     elif not proj_dir.stem.endswith("-RW214-project"):
         print("The provided path does not appear to be a valid project directory.")
@@ -34,13 +44,13 @@ def test(args: TestArgs):
             "Ensure the directory name ends with '-RW214-project'.\n\tFor example, '123456789-RW214-project'."
         )
         print("Provided path:", proj_dir)
-        return
+        return None
 
     if not all(proj_dir / ext for ext in ["src", "bin", "out"]):
         print("The provided path does not appear to be a valid project directory.")
         print("Ensure the directory contains 'src', 'bin', and 'out' subdirectories.")
         print("Provided path:", proj_dir)
-        return
+        return None
 
     print(
         TableMaker(
@@ -52,74 +62,171 @@ def test(args: TestArgs):
         )
     )
 
-    # Build the project
-    print("Building project...")
-    p = subprocess.Popen(
-        args=["javac", *src_dir.glob("*.java"), "-d", bin_dir, "-Xlint"]
-        + (["-verbose"] if args.debug else []),
-        cwd=proj_dir,
-        stderr=sys.stdout if args.debug else subprocess.PIPE,
-    )
-    total_compiled = 0
-    while total_compiled < 12:
-        # Try to compile 24 times 5 seconds each = 2 minutes total allowed time
-        try:
-            p.wait(timeout=5)
-            if args.debug:
-                print("Build successful")
-            break
-        except subprocess.TimeoutExpired:
-            total_compiled += 1
-            print("Compiling... ")
-    else:
-        print("Build failed due to timeout, please check your code and try again.")
-    out = p.stdout.read().decode("utf-8") if p.stdout else "no output"
-    err = p.stderr.read().decode("utf-8") if p.stderr else "no error output"
-    if args.debug:
-        print("stdout:\n", out)
-        print("stderr:\n", err)
-    else:
-        for line in out.splitlines():
-            if (
-                "errors" in line
-                or "warnings" in line
-                or "error" in line
-                or "warning" in line
-            ) and args.debug:
-                print(f"  {line}")
-            if line.startswith("[wrote"):
-                print("Compiled ", line.split()[1])
-        else:
-            print("No warnings")
+    return proj_dir
 
-    if p.returncode != 0:
-        print(
-            f"Build failed with return code {0 if p.returncode == None else p.returncode}, please check your code and try again."
-        )
-        return
 
+def load_testcases(debug: bool = False) -> TestSet:
     testcase_dir = Path("./testcases").resolve(strict=True)
-    if not proj_dir.exists():
-        raise FileNotFoundError("Project directory not found")
     testcases: TestSet = TestSet()
     for testcase_folder in testcase_dir.iterdir():
         if not testcase_folder.is_dir():
             continue
         try:
-            if args.debug:
+            if debug:
                 print(f"Adding {testcase_folder}")
             testcases.add(Testcase(testcase_folder))
         except TestError as e:
             print(f"Skipping {testcase_folder}: {e}")
             continue
 
-    print("Running testcases...")
-    testcases.run(proj_dir, bin_dir, args.timeout, debug=args.debug)
+    return testcases
 
-    print(
-        TableFormatter().format(
-            testcases, args.show_passing, args.details, args.error_output
-        )
+
+def test(args: TestArgs):
+    proj_dir = resolve_project(args.proj, args.debug)
+    if proj_dir is None:
+        return
+    bin_dir = proj_dir / "bin"
+    if args.trace is not None:
+        tracer.start_tracing()
+
+    # Progress is saved as the run goes, to be picked up with --resume. A new
+    # run's checkpoint is only created once the project has built.
+    source_hash = build_hash(proj_dir / "src")
+    checkpoint = None
+    if args.resume is not None:
+        try:
+            checkpoint = Checkpoint.resume(args.resume, source_hash)
+        except ValueError as e:
+            print(f"Cannot resume: {e}")
+            sys.exit(1)
+
+    # Load and schedule the testcases while the project builds
+    build_start = tracer.now()
+    build = start_build(proj_dir, args.debug)
+    with tracer.span("load testcases", "setup"):
+        testcases = load_testcases(args.debug)
+
+    with tracer.span("schedule", "setup"):
+        history = DurationHistory()
+        if args.max_failures is not None or args.time_budget is not None:
+            testcases = TestSet(prioritise(list(testcases), history))
+        else:
+            testcases = TestSet(schedule(list(testcases), history, args.failed_first))
+        if args.jobs > 1:
+            expected, ideal = forecast(list(testcases), history, args.jobs)
+            print(
+                f"Estimated time on {args.jobs} workers: {expected:.2f}s (ideal {ideal:.2f}s)"
+            )
+
+    with tracer.span("wait for build", "setup"):
+        built = finish_build(build, args.debug)
+    tracer.record("javac", "build", build_start, track="javac", ok=built)
+    if not built:
+        if args.trace is not None:
+            tracer.save_trace(args.trace)
+        return
+    if checkpoint is None:
+        checkpoint = Checkpoint.create(str(proj_dir), source_hash)
+
+    options = LaunchOptions(
+        profile_dir=args.profile, capture=args.capture, limits=args.limits
     )
+    if args.profile is not None:
+        args.profile.mkdir(parents=True, exist_ok=True)
+        print("Recording profiles to", args.profile)
+
+    startup_report = None
+    archive = None
+    if args.cds:
+        print("Building CDS archive...")
+        with tracer.span("build CDS archive", "setup"):
+            archive = build_archive(
+                testcases, proj_dir, bin_dir, args.timeout, args.debug
+            )
+        if archive is not None:
+            print("Measuring startup time...")
+            with tracer.span("measure startup", "setup"):
+                startup_report = compare_startup(
+                    testcases, proj_dir, bin_dir, args.timeout, archive
+                )
+            options = archive_options(archive, args.profile, args.capture, args.limits)
+
+    if args.spill:
+        testcases.log = ResultLog()
+        print("Spilling results to", testcases.log.path)
+
+    print(f"Running testcases, as run {checkpoint.run_id}...")
+    testcases.checkpoint = checkpoint
+    try:
+        testcases.run(
+            proj_dir,
+            bin_dir,
+            args.timeout,
+            debug=args.debug,
+            jobs=args.jobs,
+            options=options,
+            dedup=args.dedup,
+            max_failures=args.max_failures,
+            time_budget=args.time_budget,
+        )
+    except KeyboardInterrupt:
+        checkpoint.close(finished=False)
+        if testcases.log is not None:
+            testcases.log.close()
+        if archive is not None:
+            remove_archive(archive)
+        subprocess.run(["rm", "-rf", bin_dir], check=True)
+        print(f"\nInterrupted, continue with: --resume {checkpoint.run_id}")
+        sys.exit(130)
+    checkpoint.close(finished=testcases.stop_reason is None)
+    if testcases.stop_reason is not None:
+        print(f"Run the rest later with: --resume {checkpoint.run_id}")
+    timing_report = None
+    if args.stable_timing:
+        with tracer.span("stable timing", "timing"):
+            timing_report = stable_timing(
+                testcases, proj_dir, bin_dir, args.timeout, args.stable_rounds, options
+            )
+    with tracer.span("save history", "report"):
+        history.record(testcases)
+        history.save()
+        if args.history:
+            run_history = RunHistory()
+            run_id = run_history.record(testcases, testcases.summary(args), proj_dir)
+            run_history.close()
+            if args.debug:
+                print(f"Saved run {run_id} to {HISTORY_DB}")
+
+    with tracer.span("render report", "report"):
+        for chunk in TableFormatter().iter_format(
+            testcases, args.show_passing, args.details, args.error_output
+        ):
+            print(chunk, end="")
+        print()
+
+    if timing_report is not None:
+        print("Stable timings")
+        print(timing_report)
+
+    if startup_report is not None:
+        print("Startup time with and without the CDS archive")
+        print(startup_report)
+
+    if args.profile is not None:
+        print("Summarising profiles...")
+        with tracer.span("summarise profiles", "report"):
+            summary = format_profiles(
+                testcases, profile_testset(testcases, options, args.jobs)
+            )
+        print(summary)
+
+    if testcases.log is not None:
+        testcases.log.close()
+    if archive is not None:
+        remove_archive(archive)
 
     subprocess.run(["rm", "-rf", bin_dir], check=True)
+    if args.trace is not None:
+        tracer.save_trace(args.trace)
+        print("Trace written to", args.trace)
@@ -1,34 +1,101 @@
+import hashlib
 import json
 import os
-import subprocess
-import time
+import queue
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Literal, Union
+from typing import Any, Callable, Iterator, Literal, Union
 
+import tracer
 from args import TestArgs
-from common import ALLOWED_TAGS, Direction, Status
+from checkpoint import Checkpoint
+from common import ALLOWED_TAGS, LEVEL_RANGE, Direction, Status
+from launcher import Invocation, LaunchOptions, OutputPipe, launch
+from output_compare import Difference, Output, compare_output
+from progress import Progress
+from result_log import ResultLog
 from testerror import TestError
 
+# Manifest budget keys, mapped to the Invocation attribute they limit and the
+# factor converting that attribute to the budget's unit
+BUDGETS: "dict[str, tuple[str, float]]" = {
+    "max_wall_ms": ("wall", 1000),
+    "max_cpu_ms": ("cpu", 1000),
+    "max_rss_mb": ("rss", 1 / 1024),
+}
+
 
 class Testcase:
+    CONTEXTS: "dict[Direction, dict[str, str]]" = {
+        Direction.B2T: {
+            "input": "brf.brf",
+            "expected": "afr.txt",
+            "recieved": "brf_b2t.txt",
+        },
+        Direction.T2B: {
+            "input": "afr.txt",
+            "expected": "brf.brf",
+            "recieved": "afr_t2b.brf",
+        },
+    }
+
     class TestResult:
+        # Texts are given as strings, or as the path of a testcase file they
+        # are read from only when needed: outputs that match what is expected
+        # are never decoded. differences is where each direction's output first
+        # differs from the expected output, if it was compared.
         def __init__(
             self,
-            input_afr: str,
-            recieved_brf: str,
-            expected_afr: str,
-            input_brf: str,
-            recieved_afr: str,
-            expected_brf: str,
+            input_afr: "str | Path",
+            recieved_brf: "str | Path",
+            expected_afr: "str | Path",
+            input_brf: "str | Path",
+            recieved_afr: "str | Path",
+            expected_brf: "str | Path",
+            differences: "dict[Direction, Difference | None] | None" = None,
         ):
-            self.input_afr = input_afr
-            self.recieved_brf = recieved_brf
-            self.expected_afr = expected_afr
-            self.input_brf = input_brf
-            self.recieved_afr = recieved_afr
-            self.expected_brf = expected_brf
+            self._input_afr = input_afr
+            self._recieved_brf = recieved_brf
+            self._expected_afr = expected_afr
+            self._input_brf = input_brf
+            self._recieved_afr = recieved_afr
+            self._expected_brf = expected_brf
+            self.differences = differences or {}
             self.time: float = 0
 
+        @staticmethod
+        def _text(value: "str | Path") -> str:
+            if isinstance(value, Path):
+                return value.read_text(encoding="utf-8")
+            return value
+
+        @property
+        def input_afr(self) -> str:
+            return self._text(self._input_afr)
+
+        @property
+        def recieved_brf(self) -> str:
+            return self._text(self._recieved_brf)
+
+        @property
+        def expected_afr(self) -> str:
+            return self._text(self._expected_afr)
+
+        @property
+        def input_brf(self) -> str:
+            return self._text(self._input_brf)
+
+        @property
+        def recieved_afr(self) -> str:
+            return self._text(self._recieved_afr)
+
+        @property
+        def expected_brf(self) -> str:
+            return self._text(self._expected_brf)
+
         def to_dict(self):
             return {
                 "input_afr": self.input_afr,
@@ -37,9 +104,19 @@ class Testcase:
                 "input_brf": self.input_brf,
                 "recieved_afr": self.recieved_afr,
                 "expected_brf": self.expected_brf,
+                "differences": {
+                    direction.to_abv(): difference and difference.to_list()
+                    for direction, difference in self.differences.items()
+                },
             }
 
         def get_status(self, direction: Direction) -> Status:
+            if direction in self.differences:
+                return (
+                    Status.PASSED
+                    if self.differences[direction] is None
+                    else Status.FAILED
+                )
             if direction == Direction.T2B:
                 return (
                     Status.PASSED
@@ -59,6 +136,8 @@ class Testcase:
         self.name: str = None  # type: ignore
         self.description: str = None  # type: ignore
         self.level: str = None  # type: ignore
+        self.tags: "list[str]" = []
+        self.budget: "dict[str, float]" = {}
         self.result: Union[Testcase.TestResult, None] = None
         self.import_manifest()
         if strict:
@@ -66,6 +145,60 @@ class Testcase:
         self.status: Status = Status.READY
         self.out = ""
         self.err = ""
+        self.time: float = 0
+        self.statuses: "dict[Direction, Status]" = {}
+        self.invocations: "dict[Direction, Invocation]" = {}
+
+    def spill(self, log: ResultLog) -> None:
+        # Move the outputs to the log, keeping statuses and timings in memory
+        log.append(
+            self.root.name,
+            {
+                "result": self.result.to_dict() if self.result else None,
+                "output": self.out,
+                "error": self.err,
+            },
+        )
+        self.drop()
+
+    def drop(self) -> None:
+        self.result = None
+        self._results = {}
+        self._differences = {}
+        self.out = ""
+        self.err = ""
+        for invocation in self.invocations.values():
+            invocation.out = ""
+            invocation.err = ""
+
+    def restore(self, log: ResultLog) -> None:
+        record = log.read(self.root.name)
+        result = record["result"]
+        if result is not None:
+            differences = result.pop("differences")
+            self.result = self.TestResult(
+                **result,
+                differences={
+                    Direction.from_str(direction): difference
+                    and Difference(*difference)
+                    for direction, difference in differences.items()
+                },
+            )
+            self._differences = self.result.differences
+            self._results = {
+                "t2b": {
+                    "input": result["input_afr"],
+                    "expected": result["expected_brf"],
+                    "recieved": result["recieved_brf"],
+                },
+                "b2t": {
+                    "input": result["input_brf"],
+                    "expected": result["expected_afr"],
+                    "recieved": result["recieved_afr"],
+                },
+            }
+        self.out = record["output"]
+        self.err = record["error"]
 
     def passed(self, direction: Direction) -> bool:
         if self.result is None:
@@ -74,8 +207,9 @@ class Testcase:
 
     def to_dict(
         self,
-    ) -> 'dict[ Literal["name","description","level","tags","status","output","error","time","result",],Any,]':
+    ) -> 'dict[ Literal["case","name","description","level","tags","status","output","error","time","result","directions",],Any,]':
         return {
+            "case": self.root.name,
             "name": self.name,
             "description": self.description,
             "level": self.level,
@@ -84,6 +218,13 @@ class Testcase:
             "error": self.err,
             "time": self.time,
             "result": self.result.to_dict() if self.result else None,
+            "directions": {
+                direction.to_abv(): {
+                    "status": self.statuses.get(direction, Status.READY),
+                    **invocation.to_dict(),
+                }
+                for direction, invocation in self.invocations.items()
+            },
         }
 
     def import_manifest(self):
@@ -93,6 +234,8 @@ class Testcase:
                 self.name = data.get("name")
                 self.description = data.get("desc")
                 self.level = data.get("level")
+                self.tags = data.get("tags", [])
+                self.budget = data.get("budget", {})
                 # check types
                 if not isinstance(self.name, str):
                     raise TestError("Invalid name")
@@ -100,14 +243,27 @@ class Testcase:
                     raise TestError("Invalid description")
                 if not isinstance(self.level, str):
                     raise TestError("Invalid level")
+                if not isinstance(self.tags, list):
+                    raise TestError("Invalid tags")
+                if not isinstance(self.budget, dict):
+                    raise TestError("Invalid budget")
         else:
             raise FileNotFoundError("Manifest file not found")
 
     def validate(self):
         # check for valid level
-        if not 0 <= float(self.level) <= 4.1:
+        if not LEVEL_RANGE[0] <= float(self.level) <= LEVEL_RANGE[1]:
             raise TestError("Invalid level")
 
+        # check budget
+        for key, limit in self.budget.items():
+            if key not in BUDGETS:
+                raise TestError(f"Unknown budget '{key}'")
+            if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+                raise TestError(f"Budget '{key}' must be a number")
+            if limit <= 0:
+                raise TestError(f"Budget '{key}' must be positive")
+
         # check files
         # check for valid root
         if not self.root.exists():
@@ -144,23 +300,38 @@ class Testcase:
                 raise TestError("Test file(s) empty")
 
     def run(
-        self, proj_dir: Path, bin_dir: Path, timeout: float, debug: bool = False
+        self,
+        proj_dir: Path,
+        bin_dir: Path,
+        timeout: float,
+        debug: bool = False,
+        work_dir: "Path | None" = None,
+        options: "LaunchOptions | None" = None,
     ) -> None:
-        cases = {
-            Direction.B2T: {
-                "input": "brf.brf",
-                "expected": "afr.txt",
-                "recieved": "brf_b2t.txt",
-                "direction": "b2t",
-            },
-            Direction.T2B: {
-                "input": "afr.txt",
-                "expected": "brf.brf",
-                "recieved": "afr_t2b.brf",
-                "direction": "t2b",
-            },
-        }
-        results: dict[str, dict[str, str]] = {
+        with tracer.span(self.root.name, "testcase", case=self.root.name):
+            self.start()
+            for direction in (Direction.B2T, Direction.T2B):
+                invocation, recieved, error = self.execute(
+                    direction,
+                    proj_dir,
+                    bin_dir,
+                    timeout,
+                    debug=debug,
+                    work_dir=work_dir,
+                    options=options,
+                )
+                self.record(direction, invocation, recieved, error, debug=debug)
+                if recieved is not None:
+                    recieved.discard()
+            self.finish(debug=debug)
+
+    def start(self) -> None:
+        self.status = Status.RUNNING
+        self.time = 0
+        self.statuses = {}
+        self.invocations = {}
+        self._differences: "dict[Direction, Difference | None]" = {}
+        self._results: "dict[str, dict[str, str | Path]]" = {
             "t2b": {
                 "input": "None",
                 "expected": "None",
@@ -172,166 +343,304 @@ class Testcase:
                 "recieved": "None",
             },
         }
-        for context in cases.values():
-            if debug:
-                print("\n\nRunning test case: ", self.name, "@", context["direction"])
-            input_path = self.root / context["input"]
-            if debug:
-                print("Input file path: ", input_path)
-                print("Sanity check: ", input_path.exists())
-                assert input_path.exists(), "Input file not found"
-            expected_path = self.root / context["expected"]
-            if debug:
-                print("Expected file path: ", expected_path)
-                print("Sanity check: ", expected_path.exists())
-                assert expected_path.exists(), "Expected file not found"
-            results_path = proj_dir / "out" / context["recieved"]
-            if debug:
-                print("Results file path: ", results_path)
 
-            if not proj_dir.exists():
-                raise FileNotFoundError("Project directory not found")
-            if not bin_dir.exists():
-                raise FileNotFoundError("Binary directory not found")
-            if not input_path.exists():
-                raise FileNotFoundError("Input file not found")
+    def finish(self, debug: bool = False) -> None:
+        results = self._results
+        self.out = "".join(i.out for i in self.invocations.values())
+        self.err = "".join(i.err for i in self.invocations.values())
 
-            if results_path.exists():
-                if debug:
-                    print("Removing existing results file")
-                results_path.unlink()
+        if debug:
+            print("Setting results")
+        self.result = self.TestResult(
+            input_afr=results["t2b"]["input"],
+            recieved_brf=results["t2b"]["recieved"],
+            expected_brf=results["t2b"]["expected"],
+            input_brf=results["b2t"]["input"],
+            recieved_afr=results["b2t"]["recieved"],
+            expected_afr=results["b2t"]["expected"],
+            differences=self._differences,
+        )
+        for direction in self.statuses:
+            if self.statuses[direction] == Status.COMPLETE:
+                self.statuses[direction] = self.result.get_status(direction)
+        self.apply_budgets()
+
+    def apply_budgets(self) -> None:
+        # Judge passing directions against the budget, again if their
+        # invocations have since been re-timed
+        self.time = sum(invocation.wall for invocation in self.invocations.values())
+        for direction, status in self.statuses.items():
+            if status in (Status.PASSED, Status.OVER_BUDGET):
+                self.statuses[direction] = (
+                    Status.OVER_BUDGET
+                    if self.budget_breaches(direction)
+                    else Status.PASSED
+                )
+        self.status = self.combine_statuses()
+
+    def budget_breaches(self, direction: Direction) -> "list[str]":
+        invocation = self.invocations.get(direction)
+        if invocation is None:
+            return []
+        breaches = []
+        for key, limit in self.budget.items():
+            attr, scale = BUDGETS[key]
+            value = getattr(invocation, attr)
+            if value is not None and value * scale > limit:
+                breaches.append(f"{key} {value * scale:.0f} > {limit:g}")
+        return breaches
+
+    def combine_statuses(self) -> Status:
+        statuses = set(self.statuses.values())
+        for status in (
+            Status.LIMIT_EXCEEDED,
+            Status.ERROR,
+            Status.FAILED,
+            Status.OVER_BUDGET,
+        ):
+            if status in statuses:
+                return status
+        return Status.PASSED
+
+    def invocation_key(self, direction: Direction) -> str:
+        # Invocations with the same key produce the same output, whichever
+        # testcase they belong to
+        digest = hashlib.sha256()
+        digest.update((self.root / self.CONTEXTS[direction]["input"]).read_bytes())
+        digest.update(f"\0{self.level}\0{direction.to_abv()}".encode())
+        return digest.hexdigest()
+
+    def execute(
+        self,
+        direction: Direction,
+        proj_dir: Path,
+        bin_dir: Path,
+        timeout: float,
+        debug: bool = False,
+        work_dir: "Path | None" = None,
+        options: "LaunchOptions | None" = None,
+        cancel: "threading.Event | None" = None,
+    ) -> "tuple[Invocation, Output | None, str | None]":
+        # Launch the translator for one direction and read back its output.
+        # Returns the invocation, the output, and an error message if the
+        # output could not be read. Setting cancel stops the translator.
+        # work_dir replaces proj_dir as the translator's working directory, so
+        # parallel workers each get their own out/ folder
+        with tracer.on_track(f"lane {work_dir.name}" if work_dir else None):
+            with tracer.span(
+                f"{self.root.name} @ {direction.to_abv()}",
+                "translate",
+                case=self.root.name,
+                direction=direction.to_abv(),
+            ):
+                return self._execute(
+                    direction,
+                    proj_dir,
+                    bin_dir,
+                    timeout,
+                    debug,
+                    work_dir or proj_dir,
+                    options or LaunchOptions(),
+                    cancel,
+                )
 
-            self.status = Status.RUNNING
-            start_time = time.perf_counter()
+    def _execute(
+        self,
+        direction: Direction,
+        proj_dir: Path,
+        bin_dir: Path,
+        timeout: float,
+        debug: bool,
+        work_dir: Path,
+        options: LaunchOptions,
+        cancel: "threading.Event | None",
+    ) -> "tuple[Invocation, Output | None, str | None]":
+        context = self.CONTEXTS[direction]
+        if debug:
+            print("\n\nRunning test case: ", self.name, "@", direction.to_abv())
+        input_path = self.root / context["input"]
+        if debug:
+            print("Input file path: ", input_path)
+            print("Sanity check: ", input_path.exists())
+            assert input_path.exists(), "Input file not found"
+        results_path = work_dir / "out" / context["recieved"]
+        if debug:
+            print("Results file path: ", results_path)
+
+        if not proj_dir.exists():
+            raise FileNotFoundError("Project directory not found")
+        if not bin_dir.exists():
+            raise FileNotFoundError("Binary directory not found")
+        if not input_path.exists():
+            raise FileNotFoundError("Input file not found")
+
+        if results_path.exists():
             if debug:
-                print("Running java subprocess")
-            p = subprocess.Popen(
-                args=[
-                    "java",
-                    "-cp",
-                    bin_dir.absolute(),
-                    "src.Translate",
-                    "noGUI",
-                    context["direction"],
-                    self.level,
-                    input_path.absolute(),
-                    # "--debug",
-                ],
-                cwd=proj_dir,
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
+                print("Removing existing results file")
+            results_path.unlink()
+
+        pipe = OutputPipe(results_path) if options.capture == "pipe" else None
+        if debug:
+            print("Running java subprocess")
+        try:
+            invocation = launch(
+                options.command(
+                    bin_dir, direction, self.level, input_path, self.root.name
+                ),
+                cwd=work_dir,
+                timeout=timeout,
+                cancel=cancel,
+                output=pipe,
+                limits=options.limits,
+                cpus=options.cpus,
             )
+        finally:
+            captured = pipe.close() if pipe is not None else None
+        if debug:
+            print("Subprocess complete")
+            print(f"Time taken: {invocation.wall:.3f}s")
+            print(
+                "stdout:\n",
+                invocation.out if not invocation.out.isspace() else "No output",
+            )
+            print(
+                "stderr:\n",
+                invocation.err if not invocation.err.isspace() else "No output",
+            )
+        if invocation.timed_out or invocation.cancelled or invocation.limit:
+            return invocation, None, None
+
+        with tracer.span("readback", "launch"):
+            if captured is not None:
+                return invocation, Output(data=captured), None
+            # File capture, or a translator that replaced the pipe with a file
+            # of its own. The file is moved aside rather than read, as the next
+            # run in this directory writes to the same path.
             if debug:
-                print("Subprocess started")
-            self.err = p.stderr.read().decode() if p.stderr else "Unknown error"
-            self.out = p.stdout.read().decode() if p.stdout else "Unknown error"
+                print("Moving results file aside")
+            kept = results_path.with_name(f".{results_path.name}.{uuid.uuid4().hex}")
             try:
+                os.replace(results_path, kept)
+            except FileNotFoundError as e:
                 if debug:
-                    print("Waiting for subprocess to complete")
-                p.wait(timeout=timeout)
-                self.status = Status.COMPLETE
-            except subprocess.TimeoutExpired:
-                if debug:
-                    print("Subprocess timeout")
-                p.kill()
-                print(self.out + self.err)
-                self.status = Status.ERROR
-                return
-            finally:
-                if debug:
-                    print("Subprocess complete")
-                self.time = time.perf_counter() - start_time
-                if debug:
-                    print(f"Time taken: {self.time:.3f}s")
-                    print(
-                        "stdout:\n", self.out if not self.out.isspace() else "No output"
-                    )
-                    print(
-                        "stderr:\n", self.err if not self.err.isspace() else "No output"
-                    )
+                    print("FileNotFoundError: ", e)
+                return invocation, None, "File not found"
+            return invocation, Output(path=kept), None
+
+    def record(
+        self,
+        direction: Direction,
+        invocation: Invocation,
+        recieved: "Output | None",
+        error: "str | None",
+        debug: bool = False,
+    ) -> None:
+        # Check the output of an invocation, which may have been launched for
+        # another testcase with the same input, against this testcase. Only an
+        # output that differs is decoded, to be shown in the report.
+        context = self.CONTEXTS[direction]
+        results = self._results[direction.to_abv()]
+        self.invocations[direction] = invocation
+        self.time += invocation.wall
+        self.statuses[direction] = Status.COMPLETE
 
+        if invocation.timed_out:
+            # Otherwise its output is left for the report, as printing here
+            # would break into the live progress view
             if debug:
-                print("Checking subprocess return code")
-            if p.returncode != 0:
-                if debug:
-                    print("Subprocess error")
-                self.status = Status.ERROR
+                print("Subprocess timeout")
+                print(invocation.out + invocation.err)
+            self.statuses[direction] = Status.ERROR
+            results["recieved"] = "Timed out"
+            return
 
+        if invocation.limit is not None:
             if debug:
-                print("Reading console output")
-            self.err = p.stderr.read().decode() if p.stderr else "Unknown error"
-            self.out = p.stdout.read().decode() if p.stdout else "Unknown error"
+                print("Subprocess exceeded", invocation.limit)
+            self.statuses[direction] = Status.LIMIT_EXCEEDED
+            results["recieved"] = f"Exceeded {invocation.limit}"
+            return
 
+        if debug:
+            print("Checking subprocess return code")
+        if invocation.returncode != 0:
             if debug:
-                print("Reading results")
-            try:  # TODO: separate (known) input and expected file errors from results file errors
-                #       Currently, all errors cause all files to be marked as as error, regardless of the actual error
-                #       Use more manual file opening and closing for known files, and try-except for results file?
-                with open(expected_path, "r", encoding="utf-8") as out, open(
-                    input_path, "r", encoding="utf-8"
-                ) as _input, open(results_path, "r", encoding="utf-8") as rec:
-                    if debug:
-                        print("Reading files")
-                    results[context["direction"]]["input"] = _input.read()
-                    results[context["direction"]]["expected"] = out.read()
-                    results[context["direction"]]["recieved"] = rec.read()
-                    if debug:
-                        print("Reading complete")
-                if results_path.exists():
-                    if debug:
-                        print("Removing results file")
-
-                    results_path.unlink()
-                elif debug:
-                    print("Results file not found")
-            except UnicodeDecodeError as e:
-                if debug:
-                    print("UnicodeDecodeError: ", e)
-                self.status = Status.ERROR
-                results[context["direction"]]["input"] = "UnicodeDecodeError"
-                results[context["direction"]]["expected"] = "UnicodeDecodeError"
-                results[context["direction"]]["recieved"] = "UnicodeDecodeError"
-            except FileNotFoundError as e:
-                if debug:
-                    print("FileNotFoundError: ", e)
-                self.status = Status.ERROR
-                results[context["direction"]]["input"] = "File not found"
-                results[context["direction"]]["expected"] = "File not found"
-                results[context["direction"]]["recieved"] = "File not found"
-            finally:
+                print("Subprocess error")
+            self.statuses[direction] = Status.ERROR
+
+        if error is not None:
+            self.statuses[direction] = Status.ERROR
+            results["input"] = error
+            results["expected"] = error
+            results["recieved"] = error
+            return
+
+        expected = self.root / context["expected"]
+        recieved = recieved or Output()
+        try:
+            difference = compare_output(expected, recieved)
+            results["input"] = self.root / context["input"]
+            if difference is None:
+                results["expected"] = expected
+                results["recieved"] = expected
+            else:
                 if debug:
-                    print("Results complete, ensuring subprocess is closed")
-                p.wait()
+                    print("Outputs differ at", difference)
+                results["expected"] = expected.read_text(encoding="utf-8")
+                results["recieved"] = recieved.text()
+            self._differences[direction] = difference
+        except UnicodeDecodeError as e:
+            if debug:
+                print("UnicodeDecodeError: ", e)
+            self.statuses[direction] = Status.ERROR
+            results["input"] = "UnicodeDecodeError"
+            results["expected"] = "UnicodeDecodeError"
+            results["recieved"] = "UnicodeDecodeError"
 
-        if debug:
-            print("Setting results")
-        self.result = self.TestResult(
-            input_afr=results["t2b"]["input"],
-            recieved_brf=results["t2b"]["recieved"],
-            expected_brf=results["t2b"]["expected"],
-            input_brf=results["b2t"]["input"],
-            recieved_afr=results["b2t"]["recieved"],
-            expected_afr=results["b2t"]["expected"],
-        )
-        if self.status == Status.COMPLETE:
-            self.status = (
-                Status.PASSED
-                if (
-                    self.result.get_status(Direction.B2T) == Status.PASSED
-                    and self.result.get_status(Direction.T2B) == Status.PASSED
-                )
-                else Status.FAILED
-            )
+
+def make_lane(proj_dir: Path, lane: Path) -> Path:
+    # A lane mirrors the project directory through symlinks, except for a private
+    # out/ folder, so concurrent translator runs do not overwrite each other's output
+    lane.mkdir(parents=True)
+    for entry in proj_dir.iterdir():
+        if entry.name != "out":
+            (lane / entry.name).symlink_to(entry, target_is_directory=entry.is_dir())
+    (lane / "out").mkdir()
+    return lane
 
 
 class TestSet:
-    def __init__(self, testcases: "list[Testcase]" = []) -> None:
-        self.testcases = testcases
+    def __init__(self, testcases: "list[Testcase] | None" = None) -> None:
+        self.testcases = testcases if testcases is not None else []
         self.complete = False
+        self.deduplicated = 0
+        self.saved_time = 0.0
+        self.max_failures: "int | None" = None
+        self.log: "ResultLog | None" = None  # where finished outputs are spilled
+        self.checkpoint: "Checkpoint | None" = None  # where outcomes are saved
+        # (case, direction) -> case whose invocation it shared, for every
+        # invocation launched in this run
+        self.launched: "dict[tuple[str, Direction], str]" = {}
+        self.progress: "Progress | None" = None
+        self.stopped = threading.Event()
+        self.stop_reason: "str | None" = None
 
     def __iter__(self):
         return iter(self.testcases)
 
+    def replay(self) -> "Iterator[Testcase]":
+        # Every testcase with its outputs, read back one at a time from the
+        # result log if they were spilled there
+        for testcase in self.testcases:
+            if self.log is None or testcase.root.name not in self.log:
+                yield testcase
+                continue
+            testcase.restore(self.log)
+            try:
+                yield testcase
+            finally:
+                testcase.drop()
+
     def __len__(self):
         return len(self.testcases)
 
@@ -368,9 +677,39 @@ class TestSet:
             [testcase for testcase in self.testcases if testcase.status == Status.ERROR]
         )
 
+    @property
+    def limit_exceeded(self) -> int:
+        return len(
+            [
+                testcase
+                for testcase in self.testcases
+                if testcase.status == Status.LIMIT_EXCEEDED
+            ]
+        )
+
+    @property
+    def over_budget(self) -> int:
+        return len(
+            [
+                testcase
+                for testcase in self.testcases
+                if testcase.status == Status.OVER_BUDGET
+            ]
+        )
+
+    @property
+    def skipped(self) -> int:
+        return len(
+            [
+                testcase
+                for testcase in self.testcases
+                if testcase.status == Status.SKIPPED
+            ]
+        )
+
     def to_dict(self) -> 'dict[Literal["testcases", "count", "status"], Any]':
         return {
-            "testcases": [testcase.to_dict() for testcase in self.testcases],
+            "testcases": [testcase.to_dict() for testcase in self.replay()],
             "count": len(self.testcases),
             "status": self.complete,
         }
@@ -380,23 +719,259 @@ class TestSet:
             raise ValueError("Test set complete")
         self.testcases.append(testcase)
 
-    def run(self, proj_dir: Path, bin_dir: Path, timeout: float, debug: bool = False):
+    def plan(self, dedup: bool = True) -> "list[list[tuple[Testcase, Direction]]]":
+        # Group every (testcase, direction) pair by the invocation it needs, in
+        # testcase order. Only the first member of each group is launched.
+        groups: "dict[str, list[tuple[Testcase, Direction]]]" = {}
+        for testcase in self.testcases:
+            for direction in (Direction.B2T, Direction.T2B):
+                key = (
+                    testcase.invocation_key(direction)
+                    if dedup
+                    else f"{id(testcase)}-{direction.to_abv()}"
+                )
+                groups.setdefault(key, []).append((testcase, direction))
+        return list(groups.values())
+
+    def run(
+        self,
+        proj_dir: Path,
+        bin_dir: Path,
+        timeout: float,
+        debug: bool = False,
+        jobs: int = 1,
+        options: "LaunchOptions | None" = None,
+        dedup: bool = True,
+        max_failures: "int | None" = None,
+        time_budget: "float | None" = None,
+    ):
+        # Stops early once max_failures testcases have failed or errored, or
+        # time_budget seconds have passed, cancelling running translators.
+        # With a checkpoint, what it already holds is not run again.
+        plan = self.begin(dedup, debug)
+        # Set first, so failures resumed from the checkpoint count towards it
+        self.max_failures = max_failures
+        if self.checkpoint is not None:
+            plan = self._resume(plan, debug)
+        timer = None
+        if time_budget is not None:
+            timer = threading.Timer(
+                time_budget, self.stop, [f"time budget of {time_budget:g}s used up"]
+            )
+            timer.daemon = True
+            timer.start()
+
+        def work(
+            group: "list[tuple[Testcase, Direction]]", lane: "Path | None"
+        ) -> "tuple[Invocation, Output | None, str | None] | None":
+            if self.stopped.is_set():
+                return None
+            testcase, direction = group[0]
+            for member, _ in group:
+                self.launched[(member.root.name, direction)] = testcase.root.name
+            assert self.progress is not None
+            token = self.progress.launch(f"{testcase.name} @ {direction.to_abv()}")
+            try:
+                return testcase.execute(
+                    direction,
+                    proj_dir,
+                    bin_dir,
+                    timeout,
+                    debug=debug,
+                    work_dir=lane,
+                    options=options,
+                    cancel=self.stopped,
+                )
+            finally:
+                self.progress.land(token)
+
+        def collect(
+            group: "list[tuple[Testcase, Direction]]",
+            outcome: "tuple[Invocation, Output | None, str | None] | None",
+        ):
+            if outcome is not None:
+                with tracer.span("collect", "testset", size=len(group)):
+                    self.collect(group, outcome, debug=debug)
+                if self.checkpoint is not None and not outcome[0].cancelled:
+                    testcase, direction = group[0]
+                    self.checkpoint.save(
+                        [(member.root.name, d.to_abv()) for member, d in group],
+                        testcase.invocation_key(direction),
+                        outcome,
+                    )
+                if outcome[1] is not None:
+                    outcome[1].discard()
+
+        try:
+            with tracer.span(
+                "run testcases", "testset", jobs=jobs, invocations=len(plan)
+            ):
+                if jobs > 1:
+                    self._run_parallel(proj_dir, plan, work, collect, jobs)
+                else:
+                    for group in plan:
+                        collect(group, work(group, None))
+        except KeyboardInterrupt:
+            assert self.progress is not None
+            self.progress.close()
+            raise
+        if timer is not None:
+            timer.cancel()
+        self.end()
+
+    def _resume(
+        self, plan: "list[list[tuple[Testcase, Direction]]]", debug: bool = False
+    ) -> "list[list[tuple[Testcase, Direction]]]":
+        # Collect the outcomes the checkpoint holds for unchanged inputs, and
+        # return the part of the plan still to run
+        assert self.checkpoint is not None
+        remaining = []
+        resumed = 0
+        for group in plan:
+            outcomes = [
+                self.checkpoint.lookup(
+                    testcase.root.name,
+                    direction.to_abv(),
+                    testcase.invocation_key(direction),
+                )
+                for testcase, direction in group
+            ]
+            resumed += len(group) - outcomes.count(None)
+            if None not in outcomes:
+                self.collect(group, outcomes[0], debug=debug)  # type: ignore
+                continue
+            for member, outcome in zip(group, outcomes):
+                if outcome is not None:
+                    self.collect([member], outcome, debug=debug)
+            remaining.append(
+                [member for member, outcome in zip(group, outcomes) if outcome is None]
+            )
+        if resumed and self.progress is not None:
+            self.progress.log(
+                f"Resumed {resumed} translator runs from run {self.checkpoint.run_id}"
+            )
+        return remaining
+
+    def begin(
+        self, dedup: bool = True, debug: bool = False
+    ) -> "list[list[tuple[Testcase, Direction]]]":
+        # Start every testcase and return the plan; each group's outcome must
+        # then be passed to collect, from whichever runner executed it.
+        # Debug output would scroll the live progress view away.
         if self.complete:
             raise ValueError("Test set complete")
-        log_len = len(str(len(self.testcases)))
-        for i, testcase in enumerate(self.testcases):
+        plan = self.plan(dedup)
+        self.deduplicated = sum(len(group) - 1 for group in plan)
+        self.saved_time = 0.0
+        self._remaining = {id(testcase): 2 for testcase in self.testcases}
+        self._finished = 0
+        self._failures = 0  # failed, errored or over a limit, for max_failures
+        self.launched = {}
+        for testcase in self.testcases:
+            testcase.start()
+        self.progress = Progress(len(self.testcases), live=False if debug else None)
+        return plan
+
+    def collect(
+        self,
+        group: "list[tuple[Testcase, Direction]]",
+        outcome: "tuple[Invocation, Output | None, str | None]",
+        debug: bool = False,
+    ):
+        if outcome[0].cancelled:
+            # Stopped part way, the testcases are left unfinished
+            return
+        self.saved_time += outcome[0].wall * (len(group) - 1)
+        for testcase, direction in group:
+            testcase.record(direction, *outcome, debug=debug)
+            self._remaining[id(testcase)] -= 1
+            if self._remaining[id(testcase)] == 0:
+                testcase.finish(debug=debug)
+                if self.log is not None:
+                    testcase.spill(self.log)
+                self._finished += 1
+                if testcase.status in (
+                    Status.FAILED,
+                    Status.ERROR,
+                    Status.LIMIT_EXCEEDED,
+                ):
+                    self._failures += 1
+                # Only testcases that need attention get a line of their own
+                assert self.progress is not None
+                self.progress.done(
+                    testcase.status,
+                    (
+                        f"{testcase.status.name:>14} | {testcase.name:>20} | {testcase.time:.2f}s"
+                        if testcase.status != Status.PASSED
+                        else None
+                    ),
+                )
+        if self.max_failures is not None and self._failures >= self.max_failures:
+            self.stop(f"{self.max_failures} testcase(s) failed")
+
+    def stop(self, reason: str):
+        # Dispatch no more invocations and cancel the running ones
+        if not self.stopped.is_set():
+            self.stop_reason = reason
+            self.stopped.set()
+
+    def end(self):
+        self.complete = True
+        for testcase in self.testcases:
+            if self._remaining[id(testcase)]:
+                # Results of a single direction are discarded with the rest
+                testcase.status = Status.SKIPPED
+                testcase.statuses = {}
+                testcase.invocations = {}
+                testcase.time = 0
+        if self.progress is not None:
+            self.progress.close()
+        if self.stop_reason is not None:
             print(
-                f"\rRunning testcase | {i + 1:{log_len}}/{len(self.testcases):<{log_len}} | {testcase.name:>20} | ".ljust(
-                    30
-                ),
-                end="" if not debug else "\n",
+                f"Stopped early, {self.stop_reason}:"
+                f" {len(self) - self.skipped} of {len(self)} testcases run,"
+                f" {self.passed} passed, {self.failed} failed,"
+                f" {self.errored} errored, {self.skipped} skipped"
+            )
+        else:
+            print("All testcases complete")
+        if self.deduplicated and self.stop_reason is None:
+            print(
+                f"Reused {self.deduplicated} translator runs with identical input,"
+                f" saving about {self.saved_time:.2f}s"
             )
-            testcase.run(proj_dir, bin_dir, timeout, debug=debug)
-            if not debug:
-                print(f"{testcase.status.name:>10} | {testcase.time:.2f}s")
-        self.complete = True
-        print(" " * (os.get_terminal_size().columns - 2) + "\r", end="")
-        print("All testcases complete")
+
+    def _run_parallel(
+        self,
+        proj_dir: Path,
+        plan: "list[list[tuple[Testcase, Direction]]]",
+        work: "Callable[[list[tuple[Testcase, Direction]], Path | None], Any]",
+        collect: "Callable[[list[tuple[Testcase, Direction]], Any], None]",
+        jobs: int,
+    ):
+        # Workers pull invocations in plan order, so the order of self.testcases
+        # is the dispatch order. Each worker runs the translator in its own lane.
+        with tempfile.TemporaryDirectory(prefix="rw214-lanes-") as lanes_root:
+            lanes: "queue.Queue[Path]" = queue.Queue()
+            for n in range(jobs):
+                lanes.put(make_lane(proj_dir, Path(lanes_root) / str(n)))
+
+            def in_lane(group: "list[tuple[Testcase, Direction]]") -> Any:
+                lane = lanes.get()
+                try:
+                    return work(group, lane)
+                finally:
+                    lanes.put(lane)
+
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = {pool.submit(in_lane, group): group for group in plan}
+                try:
+                    for future in as_completed(futures):
+                        collect(futures[future], future.result())
+                except KeyboardInterrupt:
+                    # The pool runs every queued job before it shuts down
+                    self.stop("interrupted")
+                    raise
 
     def summary(self, args: TestArgs) -> "dict[str, int | float]":
         if not self.complete:
@@ -424,6 +999,10 @@ class TestSet:
                     if testcase.status == Status.ERROR
                 ]
             ),
+            "Over budget ": self.over_budget,
+            "Limit exceeded ": self.limit_exceeded,
+            "Skipped ": self.skipped,
+            "Deduplicated ": self.deduplicated,
             "Total ": len(self.testcases),
             "Time ": self.time,
         }
@@ -449,6 +1028,6 @@ class TestSet:
                 Any,
             ]
         ] = []
-        for testcase in self.testcases:
+        for testcase in self.replay():
             ret.append(testcase.to_dict())
         return ret
@@ -0,0 +1,135 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, ContextManager, Iterator
+
+# Timeline of a run as Chrome trace events, for chrome://tracing or Perfetto.
+# Tracing is off unless start_tracing is called; every function here is then
+# a no-op, so the hooks left in the run cost next to nothing.
+
+TRACER: "Tracer | None" = None
+
+_NO_SPAN: ContextManager[None] = contextlib.nullcontext()
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.events: "list[dict[str, Any]]" = []
+        self.tracks: "dict[str, int]" = {}  # track name -> trace tid
+        self.lock = threading.Lock()
+        # Track spans of the current thread go to, when not its own
+        self.local = threading.local()
+
+    def track(self) -> str:
+        return getattr(self.local, "track", None) or threading.current_thread().name
+
+    def add(
+        self,
+        name: str,
+        cat: str,
+        start: float,
+        end: float,
+        track: "str | None" = None,
+        args: "dict[str, Any] | None" = None,
+    ) -> None:
+        track = track or self.track()
+        with self.lock:
+            tid = self.tracks.setdefault(track, len(self.tracks))
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": args or {},
+                }
+            )
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str, args: "dict[str, Any]") -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, cat, start, time.perf_counter(), args=args)
+
+    @contextlib.contextmanager
+    def on_track(self, track: str) -> Iterator[None]:
+        previous = getattr(self.local, "track", None)
+        self.local.track = track
+        try:
+            yield
+        finally:
+            self.local.track = previous
+
+    def save(self, path: Path) -> None:
+        # Name each track, and sort them in the order they first appeared
+        metadata: "list[dict[str, Any]]" = []
+        for track, tid in self.tracks.items():
+            metadata.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": track},
+                }
+            )
+            metadata.append(
+                {
+                    "name": "thread_sort_index",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"sort_index": tid},
+                }
+            )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f
+            )
+
+
+def start_tracing() -> None:
+    global TRACER
+    TRACER = Tracer()
+
+
+def save_trace(path: Path) -> None:
+    if TRACER is not None:
+        TRACER.save(path)
+
+
+def now() -> float:
+    return time.perf_counter()
+
+
+def span(name: str, cat: str = "run", **args: Any) -> ContextManager[None]:
+    # Times the block as one event on the current track
+    if TRACER is None:
+        return _NO_SPAN
+    return TRACER.span(name, cat, args)
+
+
+def on_track(track: "str | None") -> ContextManager[None]:
+    # Puts the spans of the block on a named track, such as a worker lane,
+    # rather than the thread's own
+    if TRACER is None or track is None:
+        return _NO_SPAN
+    return TRACER.on_track(track)
+
+
+def record(
+    name: str, cat: str, start: float, track: "str | None" = None, **args: Any
+) -> None:
+    # An event from start until now, for work that is not a single block
+    if TRACER is not None:
+        TRACER.add(name, cat, start, time.perf_counter(), track, args)